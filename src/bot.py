@@ -16,7 +16,10 @@ from .utils.config import config
 from .health_check import app as health_app
 
 from .commands.utils.logging import setup_logger
+from .commands.utils.openrouter import close_shared_client
+from .commands.utils.queue import initialize_queue, close_queue
 from .commands.utils.rate_limiter import rate_limiter, rate_limited
+from .commands.utils.storage import cleanup_cache
 from .commands.utils.styles import Style
 from .commands.imagine import imagine
 from .commands.edit import edit
@@ -30,6 +33,9 @@ if not DISCORD_TOKEN:
 
 logger = setup_logger(__name__)
 
+# How often idle users are pruned from the rate limiter and expired files from the cache
+CLEANUP_INTERVAL = 3600
+
 
 class Bot(discord.Client):
     """Discord bot client with application commands."""
@@ -43,6 +49,26 @@ class Bot(discord.Client):
         intents.message_content = False
         super().__init__(intents=intents)
         self.tree = app_commands.CommandTree(self)
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    async def setup_hook(self) -> None:
+        """Start the job queue and its workers once, before the gateway connects and any interaction can reach it."""
+        initialize_queue()
+        self._cleanup_task = asyncio.create_task(self._periodic_cleanup())
+
+    async def _periodic_cleanup(self) -> None:
+        """Periodically drop rate-limit state for idle users and cache files past retention."""
+        while True:
+            await asyncio.sleep(CLEANUP_INTERVAL)
+            try:
+                await rate_limiter.cleanup_inactive_users()
+            except Exception as e:
+                logger.error(f"Rate limiter cleanup failed: {e}", exc_info=True)
+            try:
+                # Persisted seeded results accumulate while the bot runs; scan on the executor
+                await asyncio.to_thread(cleanup_cache)
+            except Exception as e:
+                logger.error(f"Cache cleanup failed: {e}", exc_info=True)
 
     async def on_ready(self) -> None:
         """Event handler for when the bot is ready."""
@@ -71,6 +97,14 @@ class Bot(discord.Client):
             # Log additional context
             logger.error("Sync failed - bot may need proper permissions or re-invite")
 
+    async def close(self) -> None:
+        """Drain the job queue and close the shared OpenRouter client before disconnecting from Discord."""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+        await close_queue()
+        await close_shared_client()
+        await super().close()
+
 
 
 async def main() -> None:
@@ -88,11 +122,11 @@ async def main() -> None:
     )
     @app_commands.choices(
         style=[
-            app_commands.Choice(name=Style.PHOTOREALISTIC.name, value=Style.PHOTOREALISTIC.value),
-            app_commands.Choice(name=Style.ANIME.name, value=Style.ANIME.value),
-            app_commands.Choice(name=Style.SKETCH.name, value=Style.SKETCH.value),
-            app_commands.Choice(name=Style.CARTOON.name, value=Style.CARTOON.value),
-            app_commands.Choice(name=Style.ABSTRACT.name, value=Style.ABSTRACT.value),
+            app_commands.Choice(name=Style.PHOTOREALISTIC.name, value=Style.PHOTOREALISTIC),
+            app_commands.Choice(name=Style.ANIME.name, value=Style.ANIME),
+            app_commands.Choice(name=Style.SKETCH.name, value=Style.SKETCH),
+            app_commands.Choice(name=Style.CARTOON.name, value=Style.CARTOON),
+            app_commands.Choice(name=Style.ABSTRACT.name, value=Style.ABSTRACT),
         ],
         format=[
             app_commands.Choice(name="PNG", value="png"),
@@ -170,7 +204,9 @@ async def main() -> None:
 
     # Start health check server in background
     async def run_health_server():
-        config = uvicorn.Config(health_app, host="0.0.0.0", port=8000, log_level="info")
+        # Probes and scrapers hit this on a schedule; skip the per-request access log
+        # and use the C HTTP parser (installed with uvicorn[standard])
+        config = uvicorn.Config(health_app, host="0.0.0.0", port=8000, log_level="info", http="httptools", access_log=False)
         server = uvicorn.Server(config)
         await server.serve()
 
@@ -185,4 +221,12 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None  # Fall back to the default asyncio loop (e.g. on Windows)
+
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
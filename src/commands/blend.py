@@ -6,17 +6,15 @@ from discord import app_commands
 globals()['discord'] = discord
 from src.commands.utils.logging import setup_logger
 from src.commands.utils.error_handler import handle_error, ErrorCategory
-from src.commands.utils.validators import validate_prompt, validate_prompt_content, validate_strength_parameter, ValidationError
+from src.commands.utils.validators import PromptView, validate_prompt, validate_prompt_content, validate_strength_parameter, ValidationError
 from src.commands.utils.rate_limiter import rate_limiter, rate_limited
-from src.commands.utils.queue import initialize_queue
+from src.commands.utils.queue import get_queue
 
 logger = setup_logger(__name__)
 
 # Set custom rate limit for blend command: 15 per minute
 rate_limiter.set_command_limit("blend", 15, 60)
 
-# Global queue, initialize once
-image_queue = None
 
 async def blend(
     interaction,
@@ -36,15 +34,12 @@ async def blend(
     # Defer the response
     await interaction.response.defer()
 
-    global image_queue
-    if image_queue is None:
-        image_queue = initialize_queue()
-
     try:
         # Validate inputs
-        await validate_prompt(interaction, prompt)
-        await validate_prompt_content(prompt)
-        await validate_strength_parameter(interaction, strength, 0.0, 1.0)
+        prompt_view = PromptView.of(prompt)
+        validate_prompt(interaction, prompt_view)
+        validate_prompt_content(prompt_view)
+        validate_strength_parameter(interaction, strength, 0.0, 1.0)
 
         # Collect sources
         sources = [src for src in [source1, source2, source3, source4, source5, source6] if src is not None]
@@ -56,7 +51,7 @@ async def blend(
             await interaction.followup.send("Processing your images... This may take a moment.", ephemeral=True)
 
         # Enqueue for asynchronous processing
-        await image_queue.enqueue_blend(interaction, prompt, sources, strength, format)
+        await get_queue().enqueue_blend(interaction, prompt, sources, strength, format)
 
     except ValidationError as e:
         await handle_error(interaction, str(e), category=e.category, include_suggestion=True)
@@ -7,14 +7,12 @@ from discord import app_commands
 globals()['discord'] = discord
 from src.commands.utils.logging import setup_logger
 from src.commands.utils.error_handler import handle_error, ErrorCategory
-from src.commands.utils.validators import validate_prompt, validate_prompt_content, ValidationError
+from src.commands.utils.validators import PromptView, validate_prompt, validate_prompt_content, ValidationError
 from src.commands.utils.rate_limiter import rate_limiter, rate_limited
-from src.commands.utils.queue import initialize_queue
+from src.commands.utils.queue import get_queue
 
 logger = setup_logger(__name__)
 
-# Global queue, initialize once
-image_queue = None
 
 async def edit(
     interaction,
@@ -32,14 +30,11 @@ async def edit(
     # Defer the response
     await interaction.response.defer()
 
-    global image_queue
-    if image_queue is None:
-        image_queue = initialize_queue()
-
     try:
         # Validate inputs
-        await validate_prompt(interaction, prompt)
-        await validate_prompt_content(prompt)
+        prompt_view = PromptView.of(prompt)
+        validate_prompt(interaction, prompt_view)
+        validate_prompt_content(prompt_view)
 
         # Collect sources
         sources = [src for src in [source1, source2, source3, source4] if src is not None]
@@ -51,7 +46,7 @@ async def edit(
             await interaction.followup.send("Processing your images... This may take a moment.", ephemeral=True)
 
         # Enqueue for asynchronous processing
-        await image_queue.enqueue_edit(interaction, prompt, sources, mask, format)
+        await get_queue().enqueue_edit(interaction, prompt, sources, mask, format)
 
     except ValidationError as e:
         await handle_error(interaction, str(e), category=e.category, include_suggestion=True)
@@ -6,18 +6,16 @@ from discord import app_commands
 globals()['discord'] = discord
 from src.commands.utils.logging import setup_logger
 from src.commands.utils.error_handler import handle_error, ErrorCategory
-from src.commands.utils.validators import validate_prompt, validate_prompt_content, validate_count_parameter, ValidationError
+from src.commands.utils.validators import PromptView, validate_prompt, validate_prompt_content, validate_count_parameter, ValidationError
 from src.commands.utils.styles import Style
 from src.commands.utils.rate_limiter import rate_limiter, rate_limited
-from src.commands.utils.queue import initialize_queue
+from src.commands.utils.queue import get_queue
 
 logger = setup_logger(__name__)
 
 # Set custom rate limit for imagine command: 5 per 5 minutes
 rate_limiter.set_command_limit("imagine", 5, 300)
 
-# Global queue, initialize once
-image_queue = None
 
 async def imagine(
     interaction,
@@ -51,18 +49,15 @@ async def imagine(
     # Defer the response
     await interaction.response.defer()
 
-    global image_queue
-    if image_queue is None:
-        image_queue = initialize_queue()
-
     try:
         # Validate inputs
-        await validate_prompt(interaction, prompt)
-        await validate_prompt_content(prompt)
-        await validate_count_parameter(interaction, count, 1, 4)
+        prompt_view = PromptView.of(prompt)
+        validate_prompt(interaction, prompt_view)
+        validate_prompt_content(prompt_view)
+        validate_count_parameter(interaction, count, 1, 4)
 
         # Enqueue for asynchronous processing
-        await image_queue.enqueue_imagine(interaction, prompt, style, count, seed, format)
+        await get_queue().enqueue_imagine(interaction, prompt, style, count, seed, format)
 
     except ValidationError as e:
         await handle_error(interaction, str(e), category=e.category, include_suggestion=True)
@@ -0,0 +1,169 @@
+"""
+Adaptive concurrency control for OpenRouter calls.
+
+BackpressureController limits how many API requests run at once and adjusts
+that limit with AIMD (additive increase, multiplicative decrease): healthy,
+fast calls slowly raise the limit, while 429/5xx errors, timeouts or slow
+responses halve it. Under provider slowdowns the queue backs off instead of
+piling more requests onto a struggling endpoint.
+
+SlidingWindowLimiter complements it with request-rate (RPM) pacing: it spaces
+calls to stay under a per-minute budget and pauses all callers when the
+provider's rate-limit headers say the budget is nearly spent.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from .logging import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Return True for errors that signal the provider is overloaded (429, 5xx, timeouts)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or 500 <= status < 600
+    return isinstance(error, httpx.TimeoutException)
+
+
+class BackpressureController:
+    def __init__(
+        self,
+        initial: float = 4.0,
+        c_min: float = 1.0,
+        c_max: float = 16.0,
+        alpha: float = 0.5,
+        beta: float = 0.5,
+        latency_target: float = 10.0,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            initial (float): Starting concurrency limit.
+            c_min (float): Lowest limit the controller will back off to.
+            c_max (float): Highest limit the controller will grow to.
+            alpha (float): Additive increase applied per healthy window of calls.
+            beta (float): Multiplicative factor applied on overload or latency breach.
+            latency_target (float): Call latency in seconds above which the limit is cut.
+        """
+        self.c_min = c_min
+        self.c_max = c_max
+        self.alpha = alpha
+        self.beta = beta
+        self.latency_target = latency_target
+        self._capacity = min(c_max, max(c_min, float(initial)))
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._cond = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current whole-number concurrency limit."""
+        return int(self._capacity)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently holding a slot."""
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        """Wait until a slot is free under the current limit and take it."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self, latency: float, error: Optional[BaseException] = None) -> None:
+        """Release a slot and feed the call outcome into the AIMD controller."""
+        async with self._cond:
+            self._in_flight -= 1
+            self.record(latency, error)
+            self._cond.notify_all()
+
+    def record(self, latency: float, error: Optional[BaseException] = None) -> None:
+        """
+        Adjust the limit based on one call's latency and outcome.
+
+        Increases are spread over a window of roughly `limit` calls so the limit
+        grows by about `alpha` per window; decreases happen at most once per
+        latency_target seconds so a burst of failures only halves it once.
+        """
+        overloaded = error is not None and is_overload_error(error)
+        if overloaded or latency > self.latency_target:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self._last_decrease = now
+                self._capacity = max(self.c_min, self._capacity * self.beta)
+                logger.warning(f"Backpressure: reducing OpenRouter concurrency to {self.limit} (latency {latency:.1f}s, error {type(error).__name__ if error else None})")
+        elif error is None:
+            self._capacity = min(self.c_max, self._capacity + self.alpha / max(1.0, self._capacity))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block and record its latency and outcome."""
+        await self.acquire()
+        start = time.monotonic()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await self.release(time.monotonic() - start, error)
+
+
+class SlidingWindowLimiter:
+    def __init__(self, rpm: int, window: float = 60.0, low_water: float = 0.1):
+        """
+        Initialize the limiter.
+
+        Args:
+            rpm (int): Requests allowed per window.
+            window (float): Window length in seconds.
+            low_water (float): Remaining/limit ratio below which callers pause until the reported reset.
+        """
+        self.rpm = rpm
+        self.window = window
+        self.low_water = low_water
+        self._timestamps: deque = deque()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait until a request may be sent within the window and any provider pause, then record it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.window:
+                    self._timestamps.popleft()
+                if self._paused_until > now:
+                    delay = self._paused_until - now
+                elif len(self._timestamps) >= self.rpm:
+                    delay = self._timestamps[0] + self.window - now
+                else:
+                    self._timestamps.append(now)
+                    return
+                await asyncio.sleep(delay)
+
+    def observe(self, remaining: Optional[float], limit: Optional[float], reset_after: Optional[float]) -> None:
+        """
+        Feed provider rate-limit headers into the limiter.
+
+        When the remaining budget drops below `low_water` of the limit (or to zero
+        when the limit is unknown), every caller pauses until the reported reset.
+        """
+        if remaining is None or reset_after is None:
+            return
+        exhausted = remaining / limit < self.low_water if limit else remaining <= 0
+        if exhausted:
+            until = time.monotonic() + reset_after
+            if until > self._paused_until:
+                self._paused_until = until
+                logger.warning(f"Rate limit: {remaining:g} request(s) left, pausing OpenRouter calls for {reset_after:.1f}s")
@@ -1,18 +1,21 @@
+import asyncio
+import contextlib
 import os
 import logging
 import tempfile
+import threading
 import base64
 import mimetypes
 import shutil
-import uuid
-from typing import List, Union, Optional, Dict, Any
+from dataclasses import dataclass
+from typing import List, Union, Optional, Dict, Any, Iterable, Iterator
 from io import BytesIO
-import uuid
 import requests
 from PIL import Image, UnidentifiedImageError
 import discord
 
 from .logging import setup_logger
+from .storage import unique_name
 from ...utils.config import config
 
 # Set up logging
@@ -28,12 +31,63 @@ class ImageDownloadError(Exception):
 class ImageProcessingError(Exception):
     pass
 
+# Pooled sessions for the synchronous URL downloads below, so repeated fetches reuse keep-alive
+# connections. These run on concurrent executor threads and requests.Session is not
+# thread-safe, so each thread gets its own.
+_thread_local = threading.local()
+
+def _http_session() -> requests.Session:
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
+
+_MIME_BY_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+
+def sniff_image_mime(data: bytes, default: str = "image/png") -> str:
+    """Guess an image MIME type from its magic bytes."""
+    for magic, mime in _MIME_BY_MAGIC:
+        if data.startswith(magic):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+@dataclass
+class ValidatedImage:
+    """Validated image bytes held in memory, ready for prepare_image_for_api."""
+    data: bytes
+    content_type: str
+    filename: str = "image.png"
+
+    @classmethod
+    def from_bytes(cls, data: bytes, filename: str = "image.png") -> "ValidatedImage":
+        return cls(data=data, content_type=sniff_image_mime(data), filename=filename)
+
+@dataclass(slots=True)
+class PreparedImage:
+    """API-ready image: a data URL for images up to 4MB, otherwise raw base64 in `data`."""
+    url: Optional[str] = None
+    data: Optional[str] = None
+
 # Helper: Convert image format
+def _already_in_format(image_bytes: bytes, target_format: str) -> bool:
+    """Check magic bytes so images already in the target format skip a PIL round-trip."""
+    if target_format in ("jpg", "jpeg"):
+        return image_bytes[:3] == b"\xff\xd8\xff"
+    if target_format == "webp":
+        return image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP"
+    return False
+
 def convert_image_format(image_bytes: bytes, target_format: str) -> bytes:
     """
     Convert image bytes to target format using PIL.
     """
-    if target_format == "png":
+    if target_format == "png" or _already_in_format(image_bytes, target_format):
         return image_bytes
     elif target_format in ["jpg", "jpeg", "webp"]:
         img = Image.open(BytesIO(image_bytes))
@@ -91,36 +145,6 @@ def validate_attachment(attachment: discord.Attachment) -> bool:
     logger.info(f"Attachment {attachment.filename} validated successfully.")
     return True
 
-# Helper: Download attachment to temp file
-def download_attachment(attachment: discord.Attachment) -> str:
-    """
-    Download the attachment and save to a temp file in CACHE_DIR.
-    Returns the temp path.
-    """
-    try:
-        response = requests.get(attachment.url, stream=True)
-        response.raise_for_status()
-        temp_filename = f"{uuid.uuid4()}_{attachment.filename}"
-        temp_path = os.path.join(CACHE_DIR, temp_filename)
-        try:
-            with open(temp_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-        except Exception as write_e:
-            # If writing fails, clean partial file
-            if os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except OSError as unlink_e:
-                    logger.warning(f"Failed to clean partial download {temp_path}: {unlink_e}")
-            raise write_e
-        logger.info(f"Downloaded {attachment.filename} to {temp_path}")
-        return temp_path
-    except Exception as e:
-        logger.error(f"Failed to download attachment {attachment.filename}: {e}")
-        raise ImageDownloadError(f"Failed to download attachment: {e}") from e
-
 # Helper: Encode to base64
 def encode_to_base64(image_input: Union[str, Image.Image]) -> str:
     """
@@ -162,7 +186,7 @@ def resize_if_large(image_path: str, max_size_mb: float = 8.0) -> str:
             while file_size_mb > max_size_mb and img.size[0] > 1 and img.size[1] > 1:
                 new_size = (img.size[0] // 2, img.size[1] // 2)
                 img = img.resize(new_size, Image.LANCZOS)
-                temp_path = os.path.join(CACHE_DIR, f"resized_{uuid.uuid4()}_{os.path.basename(image_path)}")
+                temp_path = os.path.join(CACHE_DIR, f"resized_{unique_name('_' + os.path.basename(image_path))}")
                 try:
                     img.save(temp_path, quality=85)  # Save with quality to reduce size
                 except Exception as save_e:
@@ -192,57 +216,108 @@ def resize_if_large(image_path: str, max_size_mb: float = 8.0) -> str:
         logger.error(f"Failed to resize image {image_path}: {e}")
         raise ImageProcessingError(f"Failed to resize image: {e}") from e
 
-# Main: Fetch and validate attachments
-def fetch_and_validate_attachments(attachments: List[discord.Attachment]) -> List[str]:
+# Concurrent attachment downloads allowed at once (all go to the Discord CDN)
+_ATTACHMENT_FETCH_CONCURRENCY = 8
+_attachment_fetch_semaphore = asyncio.Semaphore(_ATTACHMENT_FETCH_CONCURRENCY)
+
+def _validate_downloaded_image(data: bytes, filename: str) -> None:
+    """Check the downloaded bytes themselves: size limit and a decodable image header."""
+    if len(data) > MAX_IMAGE_MB * 1024 * 1024:
+        raise ImageValidationError(f"Attachment size exceeds {MAX_IMAGE_MB} MB.")
+    try:
+        with Image.open(BytesIO(data)) as img:
+            img.verify()
+    except Exception as e:
+        raise ImageValidationError(f"Attachment {filename} is not a valid image: {e}") from e
+
+async def _fetch_attachment(attachment: discord.Attachment) -> Optional[ValidatedImage]:
+    try:
+        validate_attachment(attachment)
+        async with _attachment_fetch_semaphore:
+            data = await attachment.read()
+        await asyncio.to_thread(_validate_downloaded_image, data, attachment.filename)
+        return ValidatedImage(data=data, content_type=attachment.content_type or "", filename=attachment.filename)
+    except ImageValidationError as e:
+        logger.error(f"Skipping attachment {attachment.filename}: {e}")
+    except (discord.HTTPException, OSError) as e:
+        logger.error(f"Skipping attachment {attachment.filename}: failed to download attachment: {e}")
+    return None
+
+async def fetch_and_validate_attachments_async(attachments: Iterable[discord.Attachment]) -> List[ValidatedImage]:
     """
-    Fetch and validate a list of attachments, return list of temp paths.
-    Validates each, downloads if valid.
+    Fetch and validate attachments: downloads all of them concurrently
+    through discord.py's own HTTP session and validates the downloaded bytes.
+    Returns in-memory images in input order (invalid ones skipped); nothing touches disk.
     """
-    validated_paths = []
-    for att in attachments:
-        try:
-            validate_attachment(att)
-            temp_path = download_attachment(att)
-            validated_paths.append(temp_path)
-        except (ImageValidationError, ImageDownloadError) as e:
-            logger.error(f"Skipping attachment {att.filename}: {e}")
-            continue  # Skip invalid
-    return validated_paths
+    images = await asyncio.gather(*(_fetch_attachment(att) for att in attachments))
+    return [image for image in images if image is not None]
+
+# Helper: Shrink in-memory image bytes if large
+def shrink_bytes_if_large(data: bytes, max_size_mb: float = 8.0) -> bytes:
+    """
+    In-memory counterpart of resize_if_large: halve dimensions until the
+    encoded bytes fit under max_size_mb, keeping the original format.
+    """
+    max_bytes = max_size_mb * 1024 * 1024
+    if len(data) <= max_bytes:
+        return data
+
+    try:
+        with Image.open(BytesIO(data)) as img:
+            image_format = img.format or 'PNG'
+            while len(data) > max_bytes and img.size[0] > 1 and img.size[1] > 1:
+                img = img.resize((img.size[0] // 2, img.size[1] // 2), Image.Resampling.LANCZOS)
+                output = BytesIO()
+                img.save(output, format=image_format, quality=85)
+                if output.tell() >= len(data):
+                    break
+                data = output.getvalue()
+        logger.info(f"Resized in-memory image to {len(data)} bytes")
+        return data
+    except UnidentifiedImageError:
+        raise ImageProcessingError("Could not process image.")
+    except Exception as e:
+        logger.error(f"Failed to resize in-memory image: {e}")
+        raise ImageProcessingError(f"Failed to resize image: {e}") from e
 
 # Main: Prepare image for API
-def prepare_image_for_api(image_path: str) -> Dict[str, Any]:
+def prepare_image_for_api(image: Union[str, ValidatedImage]) -> PreparedImage:
     """
-    Prepare image for OpenRouter API: if size <= 4MB (half of 8MB for safety), return {'url': 'data:image/...'},
-    else encode to base64 {'data': b64string}.
+    Prepare image for OpenRouter API: if size <= 4MB (half of 8MB for safety), return PreparedImage(url='data:image/...'),
+    else encode to base64 PreparedImage(data=b64string).
     Assuming OpenRouter accepts data URIs or base64.
+    Accepts a file path or in-memory ValidatedImage; the latter never touches disk.
     """
-    # First, ensure size is under 8MB by resizing if needed
-    adjusted_path = resize_if_large(image_path, max_size_mb=8.0)
-    file_size_mb = os.path.getsize(adjusted_path) / (1024 * 1024)
-
-    if file_size_mb <= 4.0:  # Threshold for URL vs base64
-        # Assume we can create a data URI
-        with open(adjusted_path, 'rb') as f:
-            image_bytes = f.read()
+    if isinstance(image, ValidatedImage):
+        image_bytes = shrink_bytes_if_large(image.data, max_size_mb=8.0)
         encoded = base64.b64encode(image_bytes).decode('utf-8')
-        mimetype, _ = mimetypes.guess_type(adjusted_path)
-        data_uri = f"data:{mimetype or 'image/png'};base64,{encoded}"
-        # Clean temp file if different from original
-        if adjusted_path != image_path:
-            try:
-                os.unlink(adjusted_path)
-            except OSError as e:
-                logger.warning(f"Failed to clean temp file {adjusted_path}: {e}")
-        return {'url': data_uri}
-    else:
-        encoded = encode_to_base64(adjusted_path)
-        # Clean temp file if different from original
+        if len(image_bytes) <= 4 * 1024 * 1024:
+            return PreparedImage(url=f"data:{image.content_type or 'image/png'};base64,{encoded}")
+        return PreparedImage(data=encoded)
+
+    image_path = image
+    with contextlib.ExitStack() as stack:
+        # First, ensure size is under 8MB by resizing if needed
+        adjusted_path = resize_if_large(image_path, max_size_mb=8.0)
+        # Clean the resized temp file exactly once, whichever way we leave
         if adjusted_path != image_path:
-            try:
-                os.unlink(adjusted_path)
-            except OSError as e:
-                logger.warning(f"Failed to clean temp file {adjusted_path}: {e}")
-        return {'data': encoded}
+            stack.callback(_remove_quietly, adjusted_path)
+        file_size_mb = os.path.getsize(adjusted_path) / (1024 * 1024)
+
+        if file_size_mb <= 4.0:  # Threshold for URL vs base64
+            # Assume we can create a data URI
+            with open(adjusted_path, 'rb') as f:
+                image_bytes = f.read()
+            encoded = base64.b64encode(image_bytes).decode('utf-8')
+            mimetype, _ = mimetypes.guess_type(adjusted_path)
+            return PreparedImage(url=f"data:{mimetype or 'image/png'};base64,{encoded}")
+        return PreparedImage(data=encode_to_base64(adjusted_path))
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError as e:
+        logger.warning(f"Failed to clean temp file {path}: {e}")
 
 # Cleanup utility
 def cleanup_temp_files(dir_path: str = CACHE_DIR) -> None:
@@ -256,12 +331,11 @@ def cleanup_temp_files(dir_path: str = CACHE_DIR) -> None:
 
 from src.commands.utils.openrouter import GeneratedImage
 
-def process_image_sources(sources_list: List[GeneratedImage], prefix: str = "image", total: int = 1, format: str = "png") -> List[Optional[discord.File]]:
+def iter_image_sources(sources_list: Iterable[GeneratedImage], prefix: str = "image", total: int = 1, format: str = "png") -> Iterator[Optional[discord.File]]:
     """
-    Convert a list of GeneratedImage objects to a list of Discord File objects.
+    Yield a Discord File (or None on failure) per GeneratedImage, one at a time.
     Handles base64, data URI, and HTTP URL formats.
     """
-    files = []
     # format for extension
     for i, img in enumerate(sources_list):
         if total > 1:
@@ -290,11 +364,11 @@ def process_image_sources(sources_list: List[GeneratedImage], prefix: str = "ima
                 except Exception as decode_error:
                     logger.error(f"Invalid base64 data for image {i+1}: {decode_error}")
                     logger.debug(f"Base64 string length: {len(base64_data)}, content preview: {base64_data[:50]}...")
-                    files.append(None)
+                    yield None
                     continue
                     
                 image_data = convert_image_format(image_data, format)
-                files.append(discord.File(fp=BytesIO(image_data), filename=filename))
+                yield discord.File(fp=BytesIO(image_data), filename=filename)
             elif img.url:
                 if img.url.startswith("data:"):
                     _, encoded = img.url.split(",", 1)
@@ -308,31 +382,28 @@ def process_image_sources(sources_list: List[GeneratedImage], prefix: str = "ima
                         image_data = base64.b64decode(encoded, validate=True)
                     except Exception as decode_error:
                         logger.error(f"Invalid base64 data in URL for image {i+1}: {decode_error}")
-                        files.append(None)
+                        yield None
                         continue
                 else:
                     # Download from URL
                     try:
-                        response = requests.get(img.url, stream=True, timeout=10)
+                        response = _http_session().get(img.url, stream=True, timeout=10)
                         response.raise_for_status()
-                        image_data = b''
-                        for chunk in response.iter_content(chunk_size=8192):
-                            image_data += chunk
+                        image_data = b''.join(response.iter_content(chunk_size=8192))
                     except Exception as download_error:
                         logger.error(f"Failed to download image from URL {img.url}: {download_error}")
-                        files.append(None)
+                        yield None
                         continue
                         
                 image_data = convert_image_format(image_data, format)
-                files.append(discord.File(fp=BytesIO(image_data), filename=filename))
+                yield discord.File(fp=BytesIO(image_data), filename=filename)
             else:
                 logger.error(f"No image data in GeneratedImage {i+1}")
-                files.append(None)
+                yield None
         except Exception as e:
             logger.error(f"Failed to process generated image {i+1}: {e}")
-            files.append(None)
+            yield None
 
-    return files
 
 # Main: Save image to cache
 def save_image_to_cache(prompt: str, image_data: bytes) -> str:
@@ -344,7 +415,7 @@ def save_image_to_cache(prompt: str, image_data: bytes) -> str:
     max_filename_length = 100
     if len(prompt_text) > max_filename_length:
         prompt_text = prompt_text[:max_filename_length]
-    filename = f"{uuid.uuid4()}_{prompt_text}.png"
+    filename = unique_name(f"_{prompt_text}.png")
     file_path = os.path.join(CACHE_DIR, filename)
 
     try:
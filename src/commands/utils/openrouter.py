@@ -1,11 +1,18 @@
 import asyncio
 import logging
-import base64
-import tempfile
+import binascii
+import email.utils
+import functools
+import hashlib
+import json
 import aiofiles
+from collections import OrderedDict
 from typing import Any, Optional, Union, List, Dict
 from pathlib import Path
 import mimetypes
+import random
+import re
+import time
 from pydantic import BaseModel
 import httpx
 from PIL import Image
@@ -17,13 +24,178 @@ try:
 except ImportError:
     AttachmentType = None  # Graceful fallback if discord not available
 
+try:
+    import xxhash  # type: ignore[import-not-found]
+except ImportError:
+    xxhash = None  # Fall back to hashlib.blake2b
+
+try:
+    import pybase64  # type: ignore[import-not-found]
+except ImportError:
+    pybase64 = None  # Fall back to binascii
+
 from ...utils.config import config
 
 # Configure logging
 import logging
 from .logging import setup_logger
+from .backpressure import SlidingWindowLimiter
 logger = setup_logger(__name__)
 
+# MIME types for the image extensions we accept; mimetypes is only consulted on a miss
+_MIME_BY_SUFFIX = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+@functools.lru_cache(maxsize=16)
+def _data_url_prefix(mime_type: str) -> str:
+    """Return the canonical "data:<mime>;base64," prefix for a MIME type."""
+    return f"data:{mime_type};base64,"
+
+# Upper bound in seconds for a single retry delay
+_RETRY_BACKOFF_CAP = 30.0
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def _backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff (1s, 2s, 4s, ...) with jitter, preferring the server's Retry-After."""
+    if retry_after is not None:
+        return min(_RETRY_BACKOFF_CAP, retry_after)
+    return min(_RETRY_BACKOFF_CAP, 2 ** attempt) + random.uniform(0, 0.5)
+
+def _header_number(value: Any) -> Optional[float]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _rate_limit_state(response: httpx.Response) -> tuple[Optional[float], Optional[float], Optional[float]]:
+    """Read (remaining, limit, seconds until reset) from rate-limit headers.
+
+    Accepts both the X-RateLimit-* and *-Requests header spellings; resets are
+    given either as seconds or as an epoch timestamp (in seconds or milliseconds).
+    """
+    headers = response.headers
+    remaining = _header_number(headers.get("X-RateLimit-Remaining-Requests") or headers.get("X-RateLimit-Remaining"))
+    limit = _header_number(headers.get("X-RateLimit-Limit-Requests") or headers.get("X-RateLimit-Limit"))
+    reset = _header_number(headers.get("X-RateLimit-Reset-Requests") or headers.get("X-RateLimit-Reset"))
+    if reset is not None:
+        if reset > 1e12:
+            reset = reset / 1000 - time.time()
+        elif reset > 1e9:
+            reset = reset - time.time()
+        reset = min(_RETRY_BACKOFF_CAP, max(0.0, reset))
+    return remaining, limit, reset
+
+# Bounds on the encoded image inputs remembered per client. The client is shared
+# process-wide, so the data URLs it keeps are capped by total size as well as count
+_IMAGE_CACHE_SIZE = 64
+_IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Leading characters of base64-encoded PNG, JPEG, GIF and WEBP files, plus data URLs
+_B64_IMG_PREFIXES = ('iVBORw0KGgo', '/9j/', 'R0lGOD', 'UklGRg', 'data:image/')
+
+# Base64 image payloads (PNG, JPEG, GIF, WEBP headers) embedded in arbitrary strings
+_B64_IMG_RE = re.compile(r'(?:iVBORw0KGgo|/9j/|R0lGOD|UklGRg)[A-Za-z0-9+/=]+')
+
+def _search_base64_leaves(obj: Any, min_length: int = 1000) -> Optional[str]:
+    """Return the first base64 image run found in any long string inside obj.
+
+    Walks the response iteratively and applies _B64_IMG_RE to each string leaf,
+    so the full response never has to be stringified.
+    """
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, str):
+            if len(current) > min_length:
+                for match in _B64_IMG_RE.finditer(current):
+                    if len(match.group()) > min_length:
+                        return match.group()
+        elif isinstance(current, dict):
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, (list, tuple)):
+            stack.extend(reversed(current))
+    return None
+
+# Read size for streaming base64 encodes; a multiple of 3 so chunks encode without padding
+_B64_CHUNK_SIZE = 3 * 64 * 1024
+
+def _b64encode_bytes(data: bytes) -> bytes:
+    """Base64-encode bytes without a trailing newline (pybase64 when available)."""
+    if pybase64 is not None:
+        return pybase64.b64encode(data)
+    return binascii.b2a_base64(data, newline=False)
+
+def _b64encode_str(data: bytes) -> str:
+    """Base64-encode bytes straight to an ASCII str."""
+    return _b64encode_bytes(data).decode("ascii")
+
+def _content_hasher():
+    """Return an incremental hasher for the short content keys used to deduplicate image inputs."""
+    if xxhash is not None:
+        return xxhash.xxh3_64()
+    return hashlib.blake2b(digest_size=16)
+
+def _exceeds_max_dim(image_path: Path) -> bool:
+    """Check from the image header alone whether a file needs downscaling."""
+    if config.max_image_dim <= 0:
+        return False
+    try:
+        with Image.open(image_path) as img:
+            return max(img.size) > config.max_image_dim
+    except Exception:
+        return False
+
+def _maybe_downscale(data: bytes, mime: str) -> tuple[bytes, str]:
+    """Downscale an image so its longest side fits config.max_image_dim.
+
+    Images already within the limit are returned untouched. Larger images are
+    resized with LANCZOS and re-encoded at quality 85 (JPEG, or WebP when the
+    image has an alpha channel). Installing pillow-simd speeds up the resize.
+    """
+    max_dim = config.max_image_dim
+    if max_dim <= 0:
+        return data, mime
+    try:
+        img = Image.open(BytesIO(data))
+    except Exception:
+        return data, mime
+    with img:
+        if max(img.size) <= max_dim:
+            return data, mime
+
+        img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+        output = BytesIO()
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            img.save(output, "WEBP", quality=85)
+            new_mime = "image/webp"
+        else:
+            rgb = img if img.mode == "RGB" else img.convert("RGB")
+            rgb.save(output, "JPEG", quality=85)
+            new_mime = "image/jpeg"
+        logger.debug(f"Downscaled image to {img.size} ({len(data)} -> {output.tell()} bytes)")
+    return output.getvalue(), new_mime
+
 class ImageInput(BaseModel):
     type: str  # "image_url" or "base64"
     image_url: Optional[str] = None
@@ -52,7 +224,26 @@ class GeneratedImage(BaseModel):
     style: Optional[str] = None
     prompt: Optional[str] = None
 
+class OpenRouterAPIError(httpx.HTTPStatusError):
+    """HTTP error from OpenRouter carrying the status code and any Retry-After hint."""
+
+    def __init__(self, message: str, *, request: httpx.Request, response: httpx.Response, retry_after: Optional[float] = None):
+        super().__init__(message, request=request, response=response)
+        self.status_code = response.status_code
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_status_error(cls, error: httpx.HTTPStatusError, retry_after: Optional[float] = None) -> "OpenRouterAPIError":
+        return cls(str(error), request=error.request, response=error.response, retry_after=retry_after)
+
+    @property
+    def is_rate_limited(self) -> bool:
+        return self.status_code == 429
+
 class OpenRouterClient:
+    # Process-wide instance handed out by shared(); see get_openrouter()/close_shared_client()
+    _shared_instance: Optional["OpenRouterClient"] = None
+
     def __init__(self):
         if not config.openrouter_api_key:
             raise ValueError("OPENROUTER_API_KEY must be set in environment variables.")
@@ -65,44 +256,116 @@ class OpenRouterClient:
             "Referer": config.referer,
             "X-Title": config.title,
         }
-        self.session = httpx.AsyncClient(timeout=config.timeout, headers=headers)
+        # One pooled client per OpenRouterClient; keep-alive connections are reused across calls
+        limits = httpx.Limits(max_connections=64, max_keepalive_connections=16, keepalive_expiry=75)
+        self.session = httpx.AsyncClient(timeout=config.timeout, headers=headers, limits=limits)
+        # LRU of already-encoded inputs, keyed by attachment URL or content hash
+        self._image_cache: "OrderedDict[str, ContentItem]" = OrderedDict()
+        self._image_cache_bytes = 0
+        # Paces every attempt (retries included) under OPENROUTER_RPM and the provider's rate-limit headers
+        self.rate_limiter: Optional[SlidingWindowLimiter] = SlidingWindowLimiter(config.openrouter_rpm) if config.openrouter_rpm else None
         logger.info("OpenRouter client initialized.")
 
+    @classmethod
+    def shared(cls) -> "OpenRouterClient":
+        """Return the process-wide client, creating it on first use.
+
+        Reusing one client keeps the httpx connection pool (and its TLS
+        sessions) warm across commands instead of reconnecting per request.
+        """
+        if cls._shared_instance is None:
+            cls._shared_instance = cls()
+        return cls._shared_instance
+
     async def close(self):
+        self._image_cache.clear()
+        self._image_cache_bytes = 0
         await self.session.aclose()
+        if OpenRouterClient._shared_instance is self:
+            OpenRouterClient._shared_instance = None
         logger.info("Session closed.")
 
-    async def _encode_image_to_base64(self, image_path: Path) -> str:
-        """Encode a local image file to base64 data URL."""
-        mime_type, _ = mimetypes.guess_type(str(image_path))
+    async def aclose(self):
+        """Alias for close(), matching the httpx/aiohttp naming."""
+        await self.close()
+
+    def _get_cached_image(self, key: str) -> Optional[ContentItem]:
+        """Return a cached ContentItem for key, refreshing its LRU position."""
+        item = self._image_cache.get(key)
+        if item is not None:
+            self._image_cache.move_to_end(key)
+            logger.debug(f"Image input cache hit for {key[:32]}")
+        return item
+
+    def _cache_image(self, key: str, item: ContentItem) -> ContentItem:
+        """Store an encoded ContentItem, evicting least recently used entries past either bound."""
+        size = len(item.image_url or "")
+        if key in self._image_cache or size > _IMAGE_CACHE_MAX_BYTES:
+            return item
+        self._image_cache[key] = item
+        self._image_cache_bytes += size
+        while len(self._image_cache) > _IMAGE_CACHE_SIZE or self._image_cache_bytes > _IMAGE_CACHE_MAX_BYTES:
+            _, evicted = self._image_cache.popitem(last=False)
+            self._image_cache_bytes -= len(evicted.image_url or "")
+        return item
+
+    @staticmethod
+    def _image_mime_type(image_path: Path) -> str:
+        """Resolve the MIME type of a local image path or raise ValueError."""
+        mime_type = _MIME_BY_SUFFIX.get(image_path.suffix.lower())
+        if mime_type is None:
+            mime_type, _ = mimetypes.guess_type(str(image_path))
         if not mime_type or not mime_type.startswith("image/"):
             raise ValueError(f"Unsupported image type for {image_path}")
+        return mime_type
+
+    async def _encode_bytes_to_data_url(self, data: bytes, mime_type: str) -> str:
+        """Downscale if needed and encode raw image bytes as a base64 data URL."""
+        data, mime_type = await asyncio.to_thread(_maybe_downscale, data, mime_type)
+        return _data_url_prefix(mime_type) + _b64encode_str(data)
+
+    @staticmethod
+    async def _file_content_key(image_path: Path) -> str:
+        """Hash a local file in chunks, without encoding it, for the input cache lookup."""
+        hasher = _content_hasher()
         async with aiofiles.open(image_path, "rb") as f:
-            data = await f.read()
-        encoded = base64.b64encode(data).decode("utf-8")
-        return f"data:{mime_type};base64,{encoded}"
-
-    async def _download_image_to_temp(self, url: str) -> Path:
-        """Download image from URL to temporary file and return path."""
-        response = await self.session.get(url)
-        response.raise_for_status()
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=Path(url).suffix)
-        async with aiofiles.open(temp_file.name, "wb") as f:
-            await f.write(response.content)
-        logger.debug(f"Downloaded image to {temp_file.name}")
-        return Path(temp_file.name)
+            while chunk := await f.read(_B64_CHUNK_SIZE):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    async def _encode_image_to_base64(self, image_path: Path) -> str:
+        """Encode a local image file to base64 data URL.
+
+        Files that fit within config.max_image_dim are read and base64-encoded
+        in 3-byte-aligned chunks, so peak memory is the encoded output plus one
+        chunk rather than the whole file twice. Larger files are read fully
+        and downscaled first.
+        """
+        mime_type = self._image_mime_type(image_path)
+        if await asyncio.to_thread(_exceeds_max_dim, image_path):
+            async with aiofiles.open(image_path, "rb") as f:
+                data = await f.read()
+            return await self._encode_bytes_to_data_url(data, mime_type)
+
+        encoded = bytearray()
+        async with aiofiles.open(image_path, "rb") as f:
+            while chunk := await f.read(_B64_CHUNK_SIZE):
+                encoded += _b64encode_bytes(chunk)
+        return _data_url_prefix(mime_type) + encoded.decode("ascii")
 
     async def _process_image_input(self, image: Union[str, Path, Attachment]) -> ContentItem:
         """Process image input (path, URL, or Attachment) into ContentItem."""
         if Attachment and isinstance(image, Attachment):
             # For Discord Attachment, use URL if possible, else download
             if image.content_type and image.content_type.startswith("image/"):
-                temp_path = await self._download_image_to_temp(image.url)
-                base64_data = await self._encode_image_to_base64(temp_path)
-                temp_path.unlink()  # Clean up
-                # Return as base64 if preferred, but to match requirement, use image_url with base64 value
-                # Actually, for OpenRouter, use base64 directly
-                return ContentItem(type="image_url", image_url=f"data:image/png;base64,{base64.split(',')[1]}")
+                cached = self._get_cached_image(image.url)
+                if cached is not None:
+                    return cached
+                # Read the attachment into memory; no temp file round-trip
+                data = await image.read()
+                mime_type = image.content_type.split(";", 1)[0].strip()
+                base64_data = await self._encode_bytes_to_data_url(data, mime_type)
+                return self._cache_image(image.url, ContentItem(type="image_url", image_url=base64_data))
             else:
                 raise ValueError("Attachment is not an image")
         elif isinstance(image, (str, Path)):
@@ -114,125 +377,150 @@ class OpenRouterClient:
                 # It's already a base64 data URL
                 return ContentItem(type="image_url", image_url=image_str)
             else:
-                # It's a local path
-                base64_data = await self._encode_image_to_base64(Path(image))
-                return ContentItem(type="image_url", image_url=base64_data)
+                # It's a local path; identical files are only encoded once, so look
+                # the content hash up before doing any encode/downscale work
+                path = Path(image)
+                self._image_mime_type(path)  # Reject unsupported types before reading the file
+                key = await self._file_content_key(path)
+                cached = self._get_cached_image(key)
+                if cached is not None:
+                    return cached
+                base64_data = await self._encode_image_to_base64(path)
+                return self._cache_image(key, ContentItem(type="image_url", image_url=base64_data))
         else:
             raise ValueError(f"Unsupported image input type: {type(image)}")
 
+    async def _process_image_inputs(self, images: List[Union[str, Path, Attachment]]) -> List[ContentItem]:
+        """Process several image inputs concurrently, preserving their order.
+
+        An attachment or path given more than once is processed by a single task,
+        since concurrent tasks for it would all miss the input cache.
+        """
+        keys = [image.url if Attachment and isinstance(image, Attachment) else str(image) for image in images]
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = {}
+                for key, image in zip(keys, images):
+                    if key not in tasks:
+                        tasks[key] = tg.create_task(self._process_image_input(image))
+        except ExceptionGroup as eg:
+            # Surface the first failure as-is so callers keep seeing ValueError etc.
+            raise eg.exceptions[0]
+        return [tasks[key].result() for key in keys]
+
     async def _make_request_with_retry(self, payload: dict) -> dict:
-        """Make request with retry logic for network errors, timeouts, and 429/5xx errors."""
+        """Make request with retry logic for network errors, timeouts, and 429/5xx errors.
+
+        Retries back off exponentially (capped, with jitter) and honour the
+        server's Retry-After header when present. HTTP failures are raised as
+        OpenRouterAPIError so callers can see the status and retry hint.
+        """
         for attempt in range(config.max_retries + 1):
             try:
+                if self.rate_limiter:
+                    await self.rate_limiter.wait()
                 response = await self.session.post(f"{self.base_url}/chat/completions", json=payload)
+                if self.rate_limiter:
+                    self.rate_limiter.observe(*_rate_limit_state(response))
                 response.raise_for_status()
                 return response.json()
             except (httpx.HTTPStatusError, httpx.RequestError) as e:
-                if attempt < config.max_retries:
-                    delay = 2 ** attempt  # Exponential backoff
-                    if isinstance(e, httpx.HTTPStatusError):
-                        if 500 <= e.response.status_code < 600 or e.response.status_code == 429:
-                            logger.warning(f"Request failed with {e.response.status_code}, retrying in {delay}s (attempt {attempt + 1}/{config.max_retries + 1})")
-                        else:
-                            logger.error(f"Request failed with status {e.response.status_code}: {e}")
-                            # Log response content for debugging
-                            try:
-                                error_content = e.response.text
-                                logger.error(f"Error response: {error_content}")
-                            except:
-                                pass
-                            raise
-                    else:
-                        logger.warning(f"Request error: {e}, retrying in {delay}s (attempt {attempt + 1}/{config.max_retries + 1})")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
+                retry_after = None
+                if isinstance(e, httpx.HTTPStatusError):
+                    status = e.response.status_code
+                    retry_after = _retry_after_seconds(e.response)
+                    if status == 429 and retry_after is not None and self.rate_limiter:
+                        # Throttling applies to every caller, not just this request
+                        self.rate_limiter.observe(0, None, retry_after)
+                    if not (500 <= status < 600 or status == 429):
+                        logger.error(f"Request failed with status {status}: {e}")
+                        # Log response content for debugging
+                        try:
+                            error_content = e.response.text
+                            logger.error(f"Error response: {error_content}")
+                        except Exception:
+                            pass
+                        raise OpenRouterAPIError.from_status_error(e, retry_after) from e
+
+                if attempt >= config.max_retries:
                     logger.error(f"Request failed after {config.max_retries + 1} attempts: {e}")
+                    if isinstance(e, httpx.HTTPStatusError):
+                        raise OpenRouterAPIError.from_status_error(e, retry_after) from e
                     raise
 
-    async def generate_image(self, prompt: str, style: Optional[str] = None, count: int = 1, seed: Optional[int] = None, format: str = "png") -> List[GeneratedImage]:
-        """Generate images from text prompt."""
-        prompt_to_send = prompt
-        if style:
-            prompt_to_send += f" in {style} style"
-        contents = [ContentItem(type="text", text=prompt_to_send)]
-        messages = [Message(role="user", content=contents)]
-        request_data = {
-            "model": self.model,
-            "messages": [m.dict() for m in messages],
-            "max_tokens": 1024,
-            "temperature": 0.7,
-            "format": format,
-        }
-        if seed:
-            request_data["seed"] = seed
-        
-        logger.debug(f"Sending image generation request with data: {request_data}")
-        
-        response = await self._make_request_with_retry(request_data)
-        # Parse response: assume response["choices"][0]["message"]["content"] contains image data
-        # For Gemini, responses might differ; assuming it's a list of base64 images or URLs
-        # For simplicity, extract as list of GeneratedImage
-        # This may need adjustment based on actual API response format
+                delay = _backoff_delay(attempt, retry_after)
+                if isinstance(e, httpx.HTTPStatusError):
+                    logger.warning(f"Request failed with {e.response.status_code}, retrying in {delay:.1f}s (attempt {attempt + 1}/{config.max_retries + 1})")
+                else:
+                    logger.warning(f"Request error: {e}, retrying in {delay:.1f}s (attempt {attempt + 1}/{config.max_retries + 1})")
+                await asyncio.sleep(delay)
+
+    def _extract_images(self, response: dict, *, prompt: str, seed: Optional[int] = None, style: Optional[str] = None) -> List[GeneratedImage]:
+        """Parse GeneratedImage objects out of a chat completion response.
+
+        Tries, in order: structured content lists or long string content,
+        message attachments and tool calls, a deep search for base64 values
+        with known image headers, and finally a regex scan of string leaves.
+        """
         images = []
-        
-        logger.debug(f"API response structure: {response.keys()}")
-        logger.debug(f"Full API response: {response}")
-        
+
+        def make_image(b64: Optional[str] = None, url: Optional[str] = None) -> GeneratedImage:
+            return GeneratedImage(url=url, base64=b64, seed=seed, model=self.model, style=style, prompt=prompt)
+
+        # Previews stringify potentially huge base64 content, so only build them when they will be logged
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug("API response structure: %s", list(response.keys()))
+
         for choice in response.get("choices", []):
             content = choice["message"].get("content", "")
-            logger.debug(f"Choice content type: {type(content)}, content preview: {str(content)[:100]}")
-            
+            if debug_enabled:
+                logger.debug("Choice content type: %s, content preview: %s", type(content), str(content)[:100])
+
             if isinstance(content, list):
                 for item in content:
                     if item.get("type") == "image":
-                        img_url = item.get("url")
                         img_b64 = item.get("base64")
                         if img_b64:
-                            # Clean base64 string
-                            img_b64 = img_b64.strip()
                             # Don't add extra padding here - let the processing function handle it
-                        images.append(GeneratedImage(url=img_url, base64=img_b64, seed=seed, model=self.model, style=style, prompt=prompt))
+                            img_b64 = img_b64.strip()
+                        images.append(make_image(b64=img_b64, url=item.get("url")))
             elif isinstance(content, str):
                 content = content.strip()
                 if len(content) > 1000:  # Likely image data
                     # Extract base64 data if it's a data URL
                     if content.startswith("data:image/"):
                         content = content.split(",", 1)[1]
-                    images.append(GeneratedImage(base64=content, model=self.model, prompt=prompt))
+                    images.append(make_image(b64=content))
                 else:
                     # Skip text-only responses like "Here you go!"
-                    logger.debug(f"Text content received: {content}")
-                    continue
-        
+                    logger.debug("Text content received: %s", content)
+
         # If no images found in content, check if there are image attachments in the response
         if not images:
             logger.debug("No images found in content, checking for attachment data...")
-            # Look for image data in various possible locations in the response
             for choice in response.get("choices", []):
-                # Check for attachments or tool calls that might contain image data
-                if "attachments" in choice.get("message", {}):
-                    for attachment in choice["message"]["attachments"]:
-                        if "image" in attachment.get("type", ""):
-                            img_data = attachment.get("data") or attachment.get("base64")
-                            if img_data:
-                                images.append(GeneratedImage(base64=img_data, seed=seed, model=self.model, style=style, prompt=prompt))
-                
+                message = choice.get("message", {})
+                # Check for attachments that might contain image data
+                for attachment in message.get("attachments", []):
+                    if "image" in attachment.get("type", ""):
+                        img_data = attachment.get("data") or attachment.get("base64")
+                        if img_data:
+                            images.append(make_image(b64=img_data))
+
                 # Check for tool_calls that might contain image generation results
-                if "tool_calls" in choice.get("message", {}):
-                    for tool_call in choice["message"]["tool_calls"]:
-                        if tool_call.get("type") == "function":
-                            function_result = tool_call.get("function", {}).get("arguments", "")
-                            try:
-                                import json
-                                parsed_result = json.loads(function_result) if isinstance(function_result, str) else function_result
-                                if isinstance(parsed_result, dict) and "image" in parsed_result:
-                                    img_data = parsed_result["image"]
-                                    if isinstance(img_data, str) and len(img_data) > 100:  # Reasonable base64 length check
-                                        images.append(GeneratedImage(base64=img_data, seed=seed, model=self.model, style=style, prompt=prompt))
-                            except:
-                                pass
-        
+                for tool_call in message.get("tool_calls", []):
+                    if tool_call.get("type") == "function":
+                        function_result = tool_call.get("function", {}).get("arguments", "")
+                        try:
+                            parsed_result = json.loads(function_result) if isinstance(function_result, str) else function_result
+                        except ValueError:
+                            continue
+                        if isinstance(parsed_result, dict) and "image" in parsed_result:
+                            img_data = parsed_result["image"]
+                            if isinstance(img_data, str) and len(img_data) > 100:  # Reasonable base64 length check
+                                images.append(make_image(b64=img_data))
+
         # If still no images, do a deep search through the entire response for base64 strings
         if not images:
             logger.debug("Performing deep search for base64 image data in response...")
@@ -241,53 +529,61 @@ class OpenRouterClient:
                 if isinstance(obj, dict):
                     for key, value in obj.items():
                         current_path = f"{path}.{key}" if path else key
-                        if isinstance(value, str) and len(value) > 1000 and value.startswith(('iVBORw0KGgo', '/9j/', 'R0lGOD', 'UklGRg')):  # Common image headers
+                        if isinstance(value, str) and len(value) > 1000 and value.startswith(_B64_IMG_PREFIXES):
                             logger.debug(f"Found potential base64 image at path: {current_path}, length: {len(value)}")
-                            images.append(GeneratedImage(base64=value, seed=seed, model=self.model, style=style, prompt=prompt))
+                            if value.startswith("data:image/"):
+                                value = value.split(",", 1)[1]  # Extract after comma
+                            images.append(make_image(b64=value))
                         else:
                             find_base64_strings(value, current_path)
                 elif isinstance(obj, list):
                     for i, item in enumerate(obj):
                         current_path = f"{path}[{i}]" if path else f"[{i}]"
                         find_base64_strings(item, current_path)
-            
+
             find_base64_strings(response)
-            
-        # If still no images found, try to extract from raw response text
+
+        # If still no images found, scan long string leaves directly with the image-header regex
         if not images:
-            logger.debug("Attempting to extract base64 from raw response as fallback...")
-            response_str = str(response)
-            # Look for common base64 patterns within the response string
-            import re
-            # Pattern to match base64 strings that look like image data (PNG, JPEG, GIF, WEBP)
-            patterns = [
-                r'iVBORw0KGgo[A-Za-z0-9+/=]+',  # PNG
-                r'/9j/[A-Za-z0-9+/=]+',          # JPEG
-                r'R0lGOD[A-Za-z0-9+/=]+',        # GIF
-                r'UklGRg[A-Za-z0-9+/=]+'         # WEBP
-            ]
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, response_str)
-                for match in matches:
-                    if len(match) > 1000:  # Reasonable minimum length for an image
-                        logger.debug(f"Found base64 pattern via regex: {pattern}, length: {len(match)}")
-                        images.append(GeneratedImage(base64=match, seed=seed, model=self.model, style=style, prompt=prompt))
-                        break  # Take the first good match
-                if images:  # If we found images, stop searching
-                    break
-        
+            logger.debug("Attempting to extract base64 from response string leaves as fallback...")
+            match = _search_base64_leaves(response)
+            if match:
+                logger.debug(f"Found base64 pattern via regex, length: {len(match)}")
+                images.append(make_image(b64=match))
+
         logger.debug(f"Parsed {len(images)} images from API response")
-        return images[:count] if images else []
+        return images
+
+    async def generate_image(self, prompt: str, style: Optional[str] = None, count: int = 1, seed: Optional[int] = None, format: str = "png") -> List[GeneratedImage]:
+        """Generate images from text prompt."""
+        prompt_to_send = prompt
+        if style:
+            prompt_to_send += f" in {style} style"
+        contents = [ContentItem(type="text", text=prompt_to_send)]
+        messages = [Message(role="user", content=contents)]
+        request_data = {
+            "model": self.model,
+            "messages": [m.dict() for m in messages],
+            "max_tokens": 1024,
+            "temperature": 0.7,
+            "format": format,
+        }
+        if seed:
+            request_data["seed"] = seed
+        
+        logger.debug("Sending image generation request with data: %s", request_data)
+
+        response = await self._make_request_with_retry(request_data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full API response: %s", response)
+        return self._extract_images(response, prompt=prompt, seed=seed, style=style)[:count]
 
     async def edit_image(self, prompt: str, sources: List[Union[str, Path, Attachment]], mask: Optional[Union[str, Path, Attachment]] = None, format: str = "png") -> List[GeneratedImage]:
         """Edit image(s) based on prompt."""
         contents = [ContentItem(type="text", text=prompt)]
-        for src in sources:
-            contents.append(await self._process_image_input(src))
-        if mask:
-            # For mask, treat as additional image
-            contents.append(await self._process_image_input(mask))
+        # For mask, treat as additional image
+        inputs = list(sources) + [mask] if mask else sources
+        contents.extend(await self._process_image_inputs(inputs))
         messages = [Message(role="user", content=contents)]
         request_data = {
             "model": self.model,
@@ -297,119 +593,14 @@ class OpenRouterClient:
             "format": format,
         }
         response = await self._make_request_with_retry(request_data)
-        # Parse similarly to generate_image
-        images = []
-        logger.debug(f"Edit API response structure: {response.keys()}")
-
-        for choice in response.get("choices", []):
-            content = choice["message"].get("content", "")
-            logger.debug(f"Edit choice content type: {type(content)}, content preview: {str(content)[:100]}")
-
-            if isinstance(content, list):
-                for item in content:
-                    if item.get("type") == "image":
-                        img_url = item.get("url")
-                        img_b64 = item.get("base64")
-                        if img_b64:
-                            img_b64 = img_b64.strip()
-                        images.append(GeneratedImage(url=img_url, base64=img_b64, model=self.model, prompt=prompt))
-            elif isinstance(content, str):
-                content = content.strip()
-                if len(content) > 1000:  # Likely image data
-                    # Extract base64 data if it's a data URL
-                    if content.startswith("data:image/"):
-                        content = content.split(",", 1)[1]
-                    images.append(GeneratedImage(base64=content, model=self.model, prompt=prompt))
-                else:
-                    # Skip text-only responses like "Here you go!"
-                    logger.debug(f"Text content received: {content}")
-                    continue
-
-        # If no images found in content, check if there are image attachments in the response
-        if not images:
-            logger.debug("No images found in edit content, checking for attachment data...")
-            # Look for image data in various possible locations in the response
-            for choice in response.get("choices", []):
-                # Check for attachments or tool calls that might contain image data
-                if "attachments" in choice.get("message", {}):
-                    for attachment in choice["message"]["attachments"]:
-                        if "image" in attachment.get("type", ""):
-                            img_data = attachment.get("data") or attachment.get("base64")
-                            if img_data:
-                                images.append(GeneratedImage(base64=img_data, model=self.model, prompt=prompt))
-
-                # Check for tool_calls that might contain image generation results
-                if "tool_calls" in choice.get("message", {}):
-                    for tool_call in choice["message"]["tool_calls"]:
-                        if tool_call.get("type") == "function":
-                            function_result = tool_call.get("function", {}).get("arguments", "")
-                            try:
-                                import json
-                                parsed_result = json.loads(function_result) if isinstance(function_result, str) else function_result
-                                if isinstance(parsed_result, dict) and "image" in parsed_result:
-                                    img_data = parsed_result["image"]
-                                    if isinstance(img_data, str) and len(img_data) > 100:  # Reasonable base64 length check
-                                        images.append(GeneratedImage(base64=img_data, model=self.model, prompt=prompt))
-                            except:
-                                pass
-
-        # If still no images, do a deep search through the entire response for base64 strings
-        if not images:
-            logger.debug("Performing deep search for base64 image data in edit response...")
-            def find_base64_strings(obj, path=""):
-                """Recursively search for base64 strings in a nested object"""
-                if isinstance(obj, dict):
-                    for key, value in obj.items():
-                        current_path = f"{path}.{key}" if path else key
-                        if isinstance(value, str) and len(value) > 1000 and (value.startswith(('iVBORw0KGgo', '/9j/', 'R0lGOD', 'UklGRg')) or value.startswith("data:image/")):  # Common image headers or data URLs
-                            logger.debug(f"Found potential base64 image at path: {current_path}, length: {len(value)}")
-                            base64_data = value
-                            if value.startswith("data:image/"):
-                                base64_data = value.split(",", 1)[1]  # Extract after comma
-                            images.append(GeneratedImage(base64=base64_data, model=self.model, prompt=prompt))
-                        else:
-                            find_base64_strings(value, current_path)
-                elif isinstance(obj, list):
-                    for i, item in enumerate(obj):
-                        current_path = f"{path}[{i}]" if path else f"[{i}]"
-                        find_base64_strings(item, current_path)
-
-            find_base64_strings(response)
-
-        # If still no images found, try to extract from raw response text
-        if not images:
-            logger.debug("Attempting to extract base64 from raw response as fallback...")
-            response_str = str(response)
-            # Look for common base64 patterns within the response string
-            import re
-            # Pattern to match base64 strings that look like image data (PNG, JPEG, GIF, WEBP)
-            patterns = [
-                r'iVBORw0KGgo[A-Za-z0-9+/=]+',  # PNG
-                r'/9j/[A-Za-z0-9+/=]+',          # JPEG
-                r'R0lGOD[A-Za-z0-9+/=]+',        # GIF
-                r'UklGRg[A-Za-z0-9+/=]+'         # WEBP
-            ]
-
-            for pattern in patterns:
-                matches = re.findall(pattern, response_str)
-                for match in matches:
-                    if len(match) > 1000:  # Reasonable minimum length for an image
-                        logger.debug(f"Found base64 pattern via regex: {pattern}, length: {len(match)}")
-                        images.append(GeneratedImage(base64=match, model=self.model, prompt=prompt))
-                        break  # Take the first good match
-                if images:  # If we found images, stop searching
-                    break
-
-        logger.debug(f"Parsed {len(images)} images from edit API response")
-        return images
+        return self._extract_images(response, prompt=prompt)
 
     async def blend_images(self, prompt: str, sources: List[Union[str, Path, Attachment]], strength: float = 0.5, format: str = "png") -> List[GeneratedImage]:
         """Blend multiple images based on prompt."""
         if not 2 <= len(sources) <= 6:
             raise ValueError("Blend requires 2-6 source images.")
         contents = [ContentItem(type="text", text=f"{prompt} with blend strength {strength}")]
-        for src in sources:
-            contents.append(await self._process_image_input(src))
+        contents.extend(await self._process_image_inputs(sources))
         messages = [Message(role="user", content=contents)]
         request_data = {
             "model": self.model,
@@ -419,106 +610,20 @@ class OpenRouterClient:
             "format": format,
         }
         response = await self._make_request_with_retry(request_data)
-        # Parse similarly to generate_image
-        images = []
-        logger.debug(f"Blend API response structure: {response.keys()}")
+        return self._extract_images(response, prompt=prompt)
+    async def __aenter__(self):
+        return self
 
-        for choice in response.get("choices", []):
-            content = choice["message"].get("content", "")
-            logger.debug(f"Blend choice content type: {type(content)}, content preview: {str(content)[:100]}")
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
-            if isinstance(content, list):
-                for item in content:
-                    if item.get("type") == "image":
-                        img_url = item.get("url")
-                        img_b64 = item.get("base64")
-                        if img_b64:
-                            img_b64 = img_b64.strip()
-                        images.append(GeneratedImage(url=img_url, base64=img_b64, model=self.model, prompt=prompt))
-            elif isinstance(content, str):
-                # Skip text-only responses like "Here you go!" - look for image data in the full response
-                logger.debug(f"Text content received: {content}")
-                continue
 
-        # If no images found in content, check if there are image attachments in the response
-        if not images:
-            logger.debug("No images found in blend content, checking for attachment data...")
-            # Look for image data in various possible locations in the response
-            for choice in response.get("choices", []):
-                # Check for attachments or tool calls that might contain image data
-                if "attachments" in choice.get("message", {}):
-                    for attachment in choice["message"]["attachments"]:
-                        if "image" in attachment.get("type", ""):
-                            img_data = attachment.get("data") or attachment.get("base64")
-                            if img_data:
-                                images.append(GeneratedImage(base64=img_data, model=self.model, prompt=prompt))
+async def get_openrouter() -> OpenRouterClient:
+    """Return the shared OpenRouterClient used across commands."""
+    return OpenRouterClient.shared()
 
-                # Check for tool_calls that might contain image generation results
-                if "tool_calls" in choice.get("message", {}):
-                    for tool_call in choice["message"]["tool_calls"]:
-                        if tool_call.get("type") == "function":
-                            function_result = tool_call.get("function", {}).get("arguments", "")
-                            try:
-                                import json
-                                parsed_result = json.loads(function_result) if isinstance(function_result, str) else function_result
-                                if isinstance(parsed_result, dict) and "image" in parsed_result:
-                                    img_data = parsed_result["image"]
-                                    if isinstance(img_data, str) and len(img_data) > 100:  # Reasonable base64 length check
-                                        images.append(GeneratedImage(base64=img_data, model=self.model, prompt=prompt))
-                            except:
-                                pass
 
-        # If still no images, do a deep search through the entire response for base64 strings
-        if not images:
-            logger.debug("Performing deep search for base64 image data in blend response...")
-            def find_base64_strings(obj, path=""):
-                """Recursively search for base64 strings in a nested object"""
-                if isinstance(obj, dict):
-                    for key, value in obj.items():
-                        current_path = f"{path}.{key}" if path else key
-                        if isinstance(value, str) and len(value) > 1000 and (value.startswith(('iVBORw0KGgo', '/9j/', 'R0lGOD', 'UklGRg')) or value.startswith("data:image/")):  # Common image headers or data URLs
-                            logger.debug(f"Found potential base64 image at path: {current_path}, length: {len(value)}")
-                            base64_data = value
-                            if value.startswith("data:image/"):
-                                base64_data = value.split(",", 1)[1]  # Extract after comma
-                            images.append(GeneratedImage(base64=base64_data, model=self.model, prompt=prompt))
-                        else:
-                            find_base64_strings(value, current_path)
-                elif isinstance(obj, list):
-                    for i, item in enumerate(obj):
-                        current_path = f"{path}[{i}]" if path else f"[{i}]"
-                        find_base64_strings(item, current_path)
-
-            find_base64_strings(response)
-
-        # If still no images found, try to extract from raw response text
-        if not images:
-            logger.debug("Attempting to extract base64 from raw response as fallback...")
-            response_str = str(response)
-            # Look for common base64 patterns within the response string
-            import re
-            # Pattern to match base64 strings that look like image data (PNG, JPEG, GIF, WEBP)
-            patterns = [
-                r'iVBORw0KGgo[A-Za-z0-9+/=]+',  # PNG
-                r'/9j/[A-Za-z0-9+/=]+',          # JPEG
-                r'R0lGOD[A-Za-z0-9+/=]+',        # GIF
-                r'UklGRg[A-Za-z0-9+/=]+'         # WEBP
-            ]
-
-            for pattern in patterns:
-                matches = re.findall(pattern, response_str)
-                for match in matches:
-                    if len(match) > 1000:  # Reasonable minimum length for an image
-                        logger.debug(f"Found base64 pattern via regex: {pattern}, length: {len(match)}")
-                        images.append(GeneratedImage(base64=match, model=self.model, prompt=prompt))
-                        break  # Take the first good match
-                if images:  # If we found images, stop searching
-                    break
-
-        logger.debug(f"Parsed {len(images)} images from blend API response")
-        return images
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.close()
\ No newline at end of file
+async def close_shared_client() -> None:
+    """Close the shared OpenRouterClient, if one was created."""
+    if OpenRouterClient._shared_instance is not None:
+        await OpenRouterClient._shared_instance.close()
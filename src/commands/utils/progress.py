@@ -0,0 +1,150 @@
+"""
+Progress embed shared by the queue processors.
+
+ProgressReporter owns the single progress message for a job. Stage changes
+are coalesced and edited at most once per `min_interval`; if a newer stage
+arrives while an edit is pending, the older one is dropped. The final
+completion edit always goes through immediately.
+"""
+import asyncio
+import functools
+import time
+from typing import Any, List, Optional, Tuple
+
+import discord
+
+from .logging import setup_logger
+
+logger = setup_logger(__name__)
+
+IN_PROGRESS_COLOR = 0x3498db
+COMPLETE_COLOR = 0x00ff00
+
+Stages = Tuple[Tuple[str, str], ...]
+
+
+@functools.lru_cache(maxsize=8)
+def stage_lines(stages: Stages) -> Tuple[str, ...]:
+    """
+    Every rendering of a stage sequence, indexed by the current stage.
+
+    Line `i` shows stages before `i` as done and the rest with their own icons;
+    the last line has every stage done. Cached so each command's lines are
+    built once per process rather than on every edit.
+    """
+    return tuple(
+        " → ".join(
+            f"✅ {label}" if i < stage else f"{icon} {label}"
+            for i, (icon, label) in enumerate(stages)
+        )
+        for stage in range(len(stages) + 1)
+    )
+
+
+class ProgressReporter:
+    def __init__(
+        self,
+        interaction: discord.Interaction[Any],
+        title: str,
+        stages: Stages,
+        prompt: str,
+        min_interval: float = 0.75,
+    ):
+        """
+        Initialize the reporter.
+
+        Args:
+            interaction (discord.Interaction): Deferred interaction to post the message on.
+            title (str): Embed title.
+            stages (tuple): (pending icon, label) pairs, in order.
+            prompt (str): Prompt shown (truncated) while the job runs.
+            min_interval (float): Minimum seconds between stage edits.
+        """
+        self.interaction = interaction
+        self.title = title
+        self.stages = stages
+        self._stage_lines = stage_lines(stages)
+        self.prompt = prompt
+        # Truncated prompt line shown on every in-progress edit, built once per job
+        self._prompt_snippet = prompt if len(prompt) <= 100 else prompt[:100] + "..."
+        self.min_interval = min_interval
+        self.message: Optional[discord.WebhookMessage] = None
+        self._stage = 0
+        self._shown_stage = 0
+        self._last_edit = 0.0
+        self._pending = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _running_embed(self, stage: int) -> discord.Embed:
+        return discord.Embed(
+            title=self.title,
+            description=f"{self._stage_lines[stage]}\n\n**Prompt:** {self._prompt_snippet}",
+            color=IN_PROGRESS_COLOR,
+        )
+
+    async def start(self, stage: int = 1) -> None:
+        """Send the progress message at `stage` and start the edit coalescer."""
+        self._stage = self._shown_stage = stage
+        self.message = await self.interaction.followup.send(embed=self._running_embed(stage))
+        self._last_edit = time.monotonic()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def advance(self, stage: int) -> None:
+        """Move to `stage`; the edit is rate limited and superseded by later stages."""
+        if stage <= self._stage:
+            return
+        self._stage = stage
+        self._pending.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._pending.wait()
+            delay = self._last_edit + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._pending.clear()
+            stage = self._stage
+            message = self.message
+            if message is None or stage == self._shown_stage:
+                continue
+            try:
+                await message.edit(embed=self._running_embed(stage))
+                self._shown_stage = stage
+            except discord.HTTPException as e:
+                logger.debug(f"Skipping progress update: {e}")
+            self._last_edit = time.monotonic()
+
+    async def close(self) -> None:
+        """Stop the coalescer, dropping any pending stage edit."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+    async def complete(
+        self,
+        summary: str,
+        prompt: Optional[str] = None,
+        view: Optional[discord.ui.View] = None,
+        files: Optional[List[discord.File]] = None,
+    ) -> None:
+        """
+        Mark every stage done and show `summary` (and the full prompt, if given).
+
+        `files` are attached in the same edit, so a finished job costs one REST call.
+        """
+        await self.close()
+        if self.message is None:
+            return
+        description = f"{self._stage_lines[-1]}\n\n{summary}"
+        if prompt:
+            description += f"\n\n**Prompt:** {prompt}"
+        kwargs: dict = {"embed": discord.Embed(title=self.title, description=description, color=COMPLETE_COLOR)}
+        if view is not None:
+            kwargs["view"] = view
+        if files:
+            # Rewind in case the streams were read already (or by a failed attempt)
+            for f in files:
+                f.reset()
+            kwargs["attachments"] = files
+        await self.message.edit(**kwargs)
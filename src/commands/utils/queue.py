@@ -1,20 +1,173 @@
 import asyncio
+import hashlib
+import itertools
+import secrets
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Dict, Any, Optional, List
+from typing import AsyncIterator, Dict, Any, Optional, List, Sequence, Set, Union, cast
 import discord
 import os
-import uuid
 import base64
 from io import BytesIO
-import requests
+from pathlib import Path
+import httpx
 from src.commands.utils.logging import setup_logger
-from src.commands.utils.openrouter import OpenRouterClient
-from src.commands.utils.images import fetch_and_validate_attachments, prepare_image_for_api, process_image_sources, CACHE_DIR
+from src.utils.config import config
+from src.commands.utils.openrouter import GeneratedImage, OpenRouterClient, OpenRouterAPIError
+from src.commands.utils.storage import cache_image, cleanup_cache, get_cached_image, is_cached_recent
+from src.commands.utils.backpressure import BackpressureController
+from src.commands.utils.progress import ProgressReporter
+from src.commands.utils.images import ValidatedImage, fetch_and_validate_attachments_async, prepare_image_for_api, iter_image_sources
 from src.commands.utils.error_handler import handle_error, ErrorCategory
 from src.commands.utils.validators import validate_prompt, validate_count_parameter, validate_strength_parameter, ValidationError
 
 logger = setup_logger(__name__)
 
+# Rendered (decoded + format-converted) file bytes keyed by source content and format,
+# so reroll/same-seed/edit iterations don't redo the decode/encode work
+_RENDERED_CACHE_MAX_ENTRIES = 128
+_RENDERED_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_rendered_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_rendered_cache_bytes = 0
+# Rendering runs on executor threads, so cache reads and evictions are serialized
+_rendered_cache_lock = threading.Lock()
+
+def _rendered_cache_key(image: Any, format: str) -> Optional[str]:
+    """Hash the image's base64 payload (or URL) together with the output format."""
+    source = getattr(image, 'base64', None) or getattr(image, 'url', None)
+    if not source:
+        return None
+    digest = hashlib.blake2b(source.encode(), digest_size=16)
+    digest.update(format.encode())
+    return digest.hexdigest()
+
+def _store_rendered(key: str, data: bytes) -> None:
+    """Insert rendered bytes, evicting least recently used entries past either bound."""
+    global _rendered_cache_bytes
+    with _rendered_cache_lock:
+        if key in _rendered_cache or len(data) > _RENDERED_CACHE_MAX_BYTES:
+            return
+        _rendered_cache[key] = data
+        _rendered_cache_bytes += len(data)
+        while len(_rendered_cache) > _RENDERED_CACHE_MAX_ENTRIES or _rendered_cache_bytes > _RENDERED_CACHE_MAX_BYTES:
+            _, evicted = _rendered_cache.popitem(last=False)
+            _rendered_cache_bytes -= len(evicted)
+
+def _render_image_file(img: Any, index: int, prefix: str, total: int, format: str) -> Optional[discord.File]:
+    """Render one image through iter_image_sources with an LRU of rendered bytes.
+
+    Returns None if the image fails to render; each discord.File wraps a fresh
+    BytesIO since sending consumes the stream.
+    """
+    filename = f"{prefix}_{index+1}.{format}" if total > 1 else f"{prefix}.{format}"
+    key = _rendered_cache_key(img, format)
+    data = None
+    if key:
+        with _rendered_cache_lock:
+            data = _rendered_cache.get(key)
+            if data is not None:
+                _rendered_cache.move_to_end(key)
+    if data is None:
+        rendered = next(iter_image_sources([img], prefix, 1, format))
+        if rendered is None:
+            return None
+        # iter_image_sources wraps the rendered bytes in a BytesIO; take them without a read
+        fp = rendered.fp
+        data = fp.getvalue() if isinstance(fp, BytesIO) else fp.read()
+        if key:
+            _store_rendered(key, data)
+    return discord.File(fp=BytesIO(data), filename=filename)
+
+async def render_files(images: List[Any], prefix: str, total: int, format: str) -> List[discord.File]:
+    """Render images concurrently on executor threads, keeping order and dropping failures.
+
+    Decoding and format conversion are CPU-bound PIL work, so they stay off the event loop.
+    """
+    rendered = await asyncio.gather(*(
+        asyncio.to_thread(_render_image_file, img, i, prefix, total, format) for i, img in enumerate(images)
+    ))
+    return [f for f in rendered if f]
+
+def _decode_b64_image(b64: str) -> ValidatedImage:
+    """Decode a base64 string or data URL (fixing missing padding) into an in-memory image."""
+    if b64.startswith('data:'):
+        _, b64 = b64.split(',', 1)
+    b64 = b64.strip()
+    missing_padding = len(b64) % 4
+    if missing_padding:
+        b64 += '=' * (4 - missing_padding)
+    return ValidatedImage.from_bytes(base64.b64decode(b64))
+
+# Seeded imagine results remembered in memory; files persist under the cache retention policy
+_RESULT_CACHE_SIZE = 64
+
+# Decoded base64 edit sources kept per queue, so Edit iterations on the same image skip the decode
+_DECODED_CACHE_SIZE = 32
+
+def _result_filename(key: str, index: int, format: str) -> str:
+    return f"imagine_{key}_img_{index + 1}.{format}"
+
+def _persist_results(key: str, images: List[Any], format: str) -> None:
+    """Write a complete set of base64 results to the cache directory, or nothing.
+
+    Sets containing URL-only results stay memory-cached; if any write fails the
+    files already written are removed, so disk never holds a partial set.
+    """
+    if not all(img.base64 for img in images):
+        return
+    written = []
+    try:
+        for i, img in enumerate(images):
+            written.append(cache_image(_decode_b64_image(img.base64).data, _result_filename(key, i, format)))
+    except (IOError, ValueError) as e:
+        logger.warning(f"Failed to persist imagine result: {e}")
+        for path in written:
+            path.unlink(missing_ok=True)
+
+def _load_cached_results(key: str, count: int, format: str) -> List[str]:
+    """Read back all `count` persisted results as base64 strings, or [] if any is missing or expired."""
+    payloads = []
+    for i in range(count):
+        filename = _result_filename(key, i, format)
+        path = get_cached_image(filename) if is_cached_recent(filename) else None
+        if path is None:
+            return []
+        try:
+            payloads.append(base64.b64encode(path.read_bytes()).decode('ascii'))
+        except OSError:
+            return []  # Removed by cleanup between the checks and the read
+    return payloads
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-run
+_background_tasks: Set[asyncio.Task] = set()
+
+def _spawn_background(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def _defer_within_budget(interaction: discord.Interaction) -> bool:
+    """Defer the interaction within the ACK budget.
+
+    Returns False if Discord could not be acknowledged in time; the token is then
+    stale, so callers must not attempt any follow-up on it.
+    """
+    try:
+        await asyncio.wait_for(interaction.response.defer(), timeout=config.ack_budget_ms / 1000)
+    except asyncio.TimeoutError:
+        logger.warning(f"delivery_expired_before_dispatch: could not defer interaction {interaction.id} within {config.ack_budget_ms}ms")
+        return False
+    return True
+
+# (pending icon, label) stages shown in each command's progress embed
+_IMAGINE_STAGES = (("⏳", "Queued"), ("🔄", "Processing"), ("🎨", "Generating"), ("🔧", "Finalizing"))
+_EDIT_STAGES = (("⏳", "Queued"), ("🔄", "Processing"), ("🎨", "Editing"), ("🔧", "Finalizing"))
+_BLEND_STAGES = (("⏳", "Queued"), ("🔄", "Processing"), ("🎨", "Blending"), ("🔧", "Finalizing"))
+
 class ImageIterationView(discord.ui.View):
     """View with buttons for image iteration options."""
     
@@ -31,43 +184,33 @@ class ImageIterationView(discord.ui.View):
     @discord.ui.button(label='🔄 Reroll', style=discord.ButtonStyle.secondary, emoji='🔄')
     async def reroll(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Generate new images with the same prompt but different seed."""
-        await interaction.response.defer()
-        
-        # Get queue and generate new images
-        global image_processing_queue
-        if image_processing_queue is None:
-            image_processing_queue = AsyncImageQueue()
-        
-        # Generate with random seed (None will generate random)
-        await image_processing_queue.enqueue_imagine(interaction, self.prompt, self.style, 1, None, self.format)
+        if not await _defer_within_budget(interaction):
+            return
+
+        # Generate with random seed (None will generate random); enqueue off the ACK path
+        _spawn_background(get_queue().enqueue_imagine(interaction, self.prompt, self.style, 1, None, self.format))
     
     @discord.ui.button(label='🎯 Variations', style=discord.ButtonStyle.secondary, emoji='🎯')
     async def variations(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Generate variations of the image."""
-        await interaction.response.defer()
-        
-        # Get queue and generate variations (4 images)
-        global image_processing_queue
-        if image_processing_queue is None:
-            image_processing_queue = AsyncImageQueue()
-        
-        await image_processing_queue.enqueue_imagine(interaction, self.prompt, self.style, 4, None, self.format)
+        if not await _defer_within_budget(interaction):
+            return
+
+        # Generate variations (4 images); enqueue off the ACK path
+        _spawn_background(get_queue().enqueue_imagine(interaction, self.prompt, self.style, 4, None, self.format))
     
     @discord.ui.button(label='🔢 Same Seed', style=discord.ButtonStyle.secondary, emoji='🔢')
     async def same_seed(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Generate with the same seed if available."""
-        await interaction.response.defer()
-        
+        if not await _defer_within_budget(interaction):
+            return
+
         if self.seed is None:
             await interaction.followup.send("No seed available for this image.", ephemeral=True)
             return
-            
-        # Get queue and generate with same seed
-        global image_processing_queue
-        if image_processing_queue is None:
-            image_processing_queue = AsyncImageQueue()
-        
-        await image_processing_queue.enqueue_imagine(interaction, self.prompt, self.style, 1, self.seed, self.format)
+
+        # Generate with same seed; enqueue off the ACK path
+        _spawn_background(get_queue().enqueue_imagine(interaction, self.prompt, self.style, 1, self.seed, self.format))
 
     @discord.ui.button(label='✏️ Edit', style=discord.ButtonStyle.primary, emoji='✏️')
     async def edit_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -109,66 +252,291 @@ class ImageIterationView(discord.ui.View):
                     source_to_use = selected_image
 
                 # Acknowledge and enqueue edit using the selected generated image
-                await modal_interaction.response.defer()
-                global image_processing_queue
-                if image_processing_queue is None:
-                    image_processing_queue = AsyncImageQueue()
+                if not await _defer_within_budget(modal_interaction):
+                    return
 
                 # Enqueue edit with the appropriate source (GeneratedImage or local path string)
-                await image_processing_queue.enqueue_edit(modal_interaction, prompt_value, [source_to_use], None, self.parent_view.format)
+                async def enqueue_and_confirm():
+                    if await get_queue().enqueue_edit(modal_interaction, prompt_value, [source_to_use], None, self.parent_view.format):
+                        await modal_interaction.followup.send(f"Enqueued edit for image {idx+1}.", ephemeral=True)
 
-                await modal_interaction.followup.send(f"Enqueued edit for image {idx+1}.", ephemeral=True)
+                _spawn_background(enqueue_and_confirm())
 
         # Show the modal to the user
         await interaction.response.send_modal(EditModal(self))
 
-# Global queue instance
-image_processing_queue = None
+# Read size for streamed source-image downloads
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Queue command -> AsyncImageQueue method; looked up by name so overridden processors are used
+_HANDLERS = {
+    'imagine': 'process_imagine',
+    'edit': 'process_edit',
+    'blend': 'process_blend',
+}
 
-@dataclass
+@dataclass(slots=True)
 class QueueItem:
     interaction: discord.Interaction[Any]
     command: str  # 'imagine', 'edit', 'blend'
     params: Dict[str, Any]
 
 class AsyncImageQueue:
-    def __init__(self):
-        self.queue = asyncio.Queue()
-        self.client = OpenRouterClient()
-        self.task = asyncio.create_task(self.worker())
-        logger.info("AsyncImageQueue initialized with background worker.")
+    def __init__(self, client: Optional[OpenRouterClient] = None, num_workers: Optional[int] = None, api_concurrency: Optional[int] = None, maxsize: Optional[int] = None):
+        # Bounded so a burst of requests is rejected up front instead of piling up
+        # interactions whose tokens expire before a worker reaches them
+        self.queue = asyncio.Queue(maxsize=maxsize or config.image_queue_max)
+        # Reuse the process-wide client (and its connection pool) unless one is injected
+        self.client = client or OpenRouterClient.shared()
+        self.num_workers = num_workers or config.concurrency
+        # Caps simultaneous OpenRouter calls independently of the worker count,
+        # adapting the cap to provider latency and 429/5xx errors
+        self.backpressure = BackpressureController(initial=api_concurrency or config.image_api_concurrency)
+        # In-flight seeded imagine jobs keyed by (prompt, style, seed, count, format)
+        self.inflight: Dict[tuple, asyncio.Future] = {}
+        # LRU of finished seeded imagine results, backed by files in the cache directory
+        self._results: "OrderedDict[str, list]" = OrderedDict()
+        # Decoded base64/data-URL sources keyed by a hash of the encoded payload
+        self._decoded: "OrderedDict[str, ValidatedImage]" = OrderedDict()
+        # Pooled client for fetching remote source images; kept separate from the
+        # OpenRouter client so its auth headers never go to third-party hosts
+        self._http = httpx.AsyncClient(
+            timeout=10,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=8),
+        )
+        # Finished jobs waiting for their Discord upload; bounded so workers can't run
+        # far ahead of delivery while holding rendered images in memory
+        self._deliver_q: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=self.num_workers * 2)
+        # Queued or running jobs per user id, capped at USER_MAX_INFLIGHT
+        self._user_inflight: Dict[int, int] = {}
+        # Set by aclose(); new jobs are rejected while the queue drains
+        self.closing = False
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.num_workers)]
+        # Uploads run on their own tasks so a worker's next API call overlaps the previous upload
+        self.tasks += [asyncio.create_task(self.deliverer()) for _ in range(self.num_workers)]
+        logger.info(f"AsyncImageQueue initialized with {self.num_workers} background workers.")
 
     async def worker(self):
         while True:
+            item = await self.queue.get()
+            await self._run_item(item)
+
+    async def deliverer(self):
+        while True:
+            reporter, summary, kwargs = await self._deliver_q.get()
             try:
-                item = await self.queue.get()
-                logger.debug(f"Processing queue item: {item.command}")
-                if item.command == 'imagine':
-                    await self.process_imagine(item)
-                elif item.command == 'edit':
-                    await self.process_edit(item)
-                elif item.command == 'blend':
-                    await self.process_blend(item)
-                else:
-                    logger.error(f"Unknown command: {item.command}")
-                    await handle_error(item.interaction, "Unknown command in queue.", category=ErrorCategory.INTERNAL)
+                await reporter.complete(summary, **kwargs)
             except Exception as e:
-                logger.error(f"Error processing queue item: {e}", exc_info=True)
-                await handle_error(item.interaction, "Queue processing failed.", category=ErrorCategory.INTERNAL)
+                logger.error(f"Error delivering results: {e}", exc_info=True)
+                await self._report_failure(reporter.interaction, e)
             finally:
-                self.queue.task_done()
+                self._deliver_q.task_done()
 
-    async def enqueue_imagine(self, interaction: discord.Interaction[Any], prompt: str, style: Optional[str] = None, count: int = 1, seed: Optional[int] = None, format: str = "png"):
-        await self.queue.put(QueueItem(interaction, 'imagine', {'prompt': prompt, 'style': style, 'count': count, 'seed': seed, 'format': format}))
-        logger.debug(f"Enqueued imagine request for user {interaction.user}")
+    async def _deliver(self, reporter: ProgressReporter, summary: str, **kwargs) -> None:
+        """Queue the final progress edit (and its files) for a deliverer task."""
+        await self._deliver_q.put((reporter, summary, kwargs))
 
-    async def enqueue_edit(self, interaction: discord.Interaction[Any], prompt: str, sources: list, mask: Optional[discord.Attachment] = None, format: str = "png"):
-        await self.queue.put(QueueItem(interaction, 'edit', {'prompt': prompt, 'sources': sources, 'mask': mask, 'format': format}))
-        logger.debug(f"Enqueued edit request for user {interaction.user}")
+    async def _run_item(self, item: QueueItem) -> None:
+        """Process one job, reporting failures to its user and marking it done."""
+        try:
+            logger.debug(f"Processing queue item: {item.command}")
+            handler = _HANDLERS.get(item.command)
+            if handler is not None:
+                await getattr(self, handler)(item)
+            else:
+                logger.error(f"Unknown command: {item.command}")
+                await handle_error(item.interaction, "Unknown command in queue.", category=ErrorCategory.INTERNAL)
+        except Exception as e:
+            logger.error(f"Error processing queue item: {e}", exc_info=True)
+            await handle_error(item.interaction, "Queue processing failed.", category=ErrorCategory.INTERNAL)
+        finally:
+            self._release_user(item)
+            self.queue.task_done()
+
+    def _release_user(self, item: QueueItem) -> None:
+        user_id = item.interaction.user.id
+        remaining = self._user_inflight.get(user_id, 0) - 1
+        if remaining > 0:
+            self._user_inflight[user_id] = remaining
+        else:
+            self._user_inflight.pop(user_id, None)
+
+    async def aclose(self, drain_timeout: float = 10.0) -> None:
+        """Stop accepting jobs, give queued ones `drain_timeout` seconds to finish, then cancel the workers."""
+        self.closing = True
+        try:
+            await asyncio.wait_for(self._drain(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Queue shutdown: cancelling workers with {self.queue.qsize()} job(s) still queued")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self._http.aclose()
+        logger.info("AsyncImageQueue shut down.")
+
+    async def _drain(self) -> None:
+        await self.queue.join()
+        await self._deliver_q.join()
+
+    async def _generate_cached(self, prompt: str, style: Optional[str], count: int, seed: Optional[int], format: str) -> list:
+        """Generate images, reusing earlier results for identical seeded requests.
+
+        Seeded requests are reproducible, so their results are kept in memory
+        (and on disk, subject to cache retention) and returned without an API
+        call. Unseeded requests are intentionally random and never cached.
+        """
+        if seed is None:
+            return await self._generate_parallel(prompt, style, count, seed, format)
+
+        key = hashlib.sha256(f"{prompt}|{style}|{seed}|{count}|{format}".encode()).hexdigest()
+        cached = self._results.get(key)
+        if cached is None:
+            payloads = await asyncio.to_thread(_load_cached_results, key, count, format)
+            if payloads:
+                model = getattr(self.client, 'model', None)
+                cached = [GeneratedImage(base64=b64, seed=seed, model=model, style=style, prompt=prompt) for b64 in payloads]
+                self._remember_results(key, cached)
+        else:
+            self._results.move_to_end(key)
+        if cached:
+            logger.debug("Serving seeded imagine request from the result cache")
+            return cached
+
+        images = await self._generate_parallel(prompt, style, count, seed, format)
+        if len(images) == count:
+            self._remember_results(key, images)
+            _spawn_background(asyncio.to_thread(_persist_results, key, images, format))
+        return images
+
+    def _remember_results(self, key: str, images: list) -> None:
+        self._results[key] = images
+        self._results.move_to_end(key)
+        while len(self._results) > _RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+    async def _generate_parallel(self, prompt: str, style: Optional[str], count: int, seed: Optional[int], format: str) -> list:
+        """Generate `count` images as concurrent single-image calls under backpressure.
+
+        Each image gets its own seed (consecutive from `seed` when given, random
+        otherwise) so results differ and remain reproducible. Partial failures
+        return the images that succeeded; only a total failure raises.
+        """
+        if count <= 1:
+            return await self._generate_coalesced(prompt, style, count, seed, format)
+
+        seeds = [seed + i if seed is not None else secrets.randbits(32) for i in range(count)]
+        results = await asyncio.gather(
+            *(self._generate_coalesced(prompt, style, 1, s, format) for s in seeds),
+            return_exceptions=True,
+        )
+        images = [img for result in results if not isinstance(result, BaseException) for img in result]
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            if not images:
+                raise errors[0]
+            logger.warning(f"{len(errors)} of {count} parallel generations failed: {errors[0]}")
+        return images
+
+    async def _generate_coalesced(self, prompt: str, style: Optional[str], count: int, seed: Optional[int], format: str) -> list:
+        """Generate images, sharing one API call between identical in-flight seeded requests.
+
+        Unseeded requests are intentionally random, so they always make their own call.
+        """
+        if seed is None:
+            async with self.backpressure.slot():
+                return await self.client.generate_image(prompt=prompt, style=style, count=count, seed=seed, format=format)
+
+        key = (prompt, style, seed, count, format)
+        pending = self.inflight.get(key)
+        if pending is not None:
+            logger.debug("Joining in-flight imagine request with identical parameters")
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            async with self.backpressure.slot():
+                images = await self.client.generate_image(prompt=prompt, style=style, count=count, seed=seed, format=format)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unobserved failure isn't logged twice
+            raise
+        else:
+            future.set_result(images)
+            return images
+        finally:
+            del self.inflight[key]
+
+    async def _report_failure(self, interaction: discord.Interaction[Any], error: Exception):
+        """Report a failed job, explaining OpenRouter throttling/outages instead of a generic error."""
+        if isinstance(error, OpenRouterAPIError) and (error.is_rate_limited or error.status_code >= 500):
+            message = "OpenRouter is busy right now and the request could not be completed."
+            if error.retry_after:
+                message += f" Please try again in {int(error.retry_after) + 1} seconds."
+            else:
+                message += " Please try again shortly."
+            await handle_error(interaction, message, category=ErrorCategory.API)
+        else:
+            await handle_error(interaction, "Unexpected error occurred.", category=ErrorCategory.INTERNAL)
+
+    @asynccontextmanager
+    async def _progress(self, interaction: discord.Interaction[Any], title: str, stages, prompt: str, job: str) -> AsyncIterator[ProgressReporter]:
+        """
+        Run a job body under a progress message.
+
+        Sends the initial embed, yields the reporter, and reports any exception
+        escaping the body: validation errors with a suggestion, everything else
+        via _report_failure. The reporter is always closed.
+        """
+        reporter = ProgressReporter(interaction, title, stages, prompt)
+        await reporter.start()
+        try:
+            yield reporter
+        except ValidationError as e:
+            await handle_error(interaction, str(e), category=e.category, include_suggestion=True)
+        except Exception as e:
+            logger.error(f"Error in queue {job}: {e}", exc_info=True)
+            await self._report_failure(interaction, e)
+        finally:
+            await reporter.close()
+
+    def current_occupancy(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self.queue.qsize()
+
+    async def _admit(self, item: QueueItem) -> bool:
+        """Enqueue without waiting; tell the user to retry if the queue is full, shutting down, or they have too many jobs."""
+        if self.closing:
+            await item.interaction.followup.send("The bot is restarting, try again in a moment.", ephemeral=True)
+            return False
+        user_id = item.interaction.user.id
+        inflight = self._user_inflight.get(user_id, 0)
+        if inflight >= config.user_max_inflight:
+            logger.info(f"Rejecting {item.command} request for user {item.interaction.user}: {inflight} job(s) already in flight")
+            await item.interaction.followup.send("You already have requests in progress, wait for one to finish.", ephemeral=True)
+            return False
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.warning(f"Queue full ({self.queue.maxsize}), rejecting {item.command} request for user {item.interaction.user}")
+            await item.interaction.followup.send("Server busy, try again in a moment.", ephemeral=True)
+            return False
+        self._user_inflight[user_id] = inflight + 1
+        logger.debug(f"Enqueued {item.command} request for user {item.interaction.user}")
+        return True
+
+    async def enqueue_imagine(self, interaction: discord.Interaction[Any], prompt: str, style: Optional[str] = None, count: int = 1, seed: Optional[int] = None, format: str = "png") -> bool:
+        return await self._admit(QueueItem(interaction, 'imagine', {'prompt': prompt, 'style': style, 'count': count, 'seed': seed, 'format': format}))
+
+    async def enqueue_edit(self, interaction: discord.Interaction[Any], prompt: str, sources: list, mask: Optional[discord.Attachment] = None, format: str = "png") -> bool:
+        return await self._admit(QueueItem(interaction, 'edit', {'prompt': prompt, 'sources': sources, 'mask': mask, 'format': format}))
 
-    async def enqueue_blend(self, interaction: discord.Interaction[Any], prompt: str, sources: list, strength: float = 0.5, format: str = "png"):
-        await self.queue.put(QueueItem(interaction, 'blend', {'prompt': prompt, 'sources': sources, 'strength': strength, 'format': format}))
-        logger.debug(f"Enqueued blend request for user {interaction.user}")
+    async def enqueue_blend(self, interaction: discord.Interaction[Any], prompt: str, sources: list, strength: float = 0.5, format: str = "png") -> bool:
+        return await self._admit(QueueItem(interaction, 'blend', {'prompt': prompt, 'sources': sources, 'strength': strength, 'format': format}))
 
     async def process_imagine(self, item: QueueItem):
         params = item.params
@@ -179,62 +547,80 @@ class AsyncImageQueue:
         seed = params['seed']
         format = params.get('format', 'png')
 
-        # Single progress message starting with queued
-        embed = discord.Embed(
-            title="🎨 Image Generation Progress",
-            description=f"⏳ Queued → 🔄 Processing → 🎨 Generating → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}",
-            color=0x3498db
-        )
-        progress_msg = await interaction.followup.send(embed=embed)
-
-        # Copied from original imagine handler (without defer since already deferred)
-        try:
-            await asyncio.sleep(0.5)
-
-            # Update to processing
-            embed.description = f"✅ Queued → 🔄 Processing → 🎨 Generating → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
-            await asyncio.sleep(0.5)
-
-            # Update to generating
-            embed.description = f"✅ Queued → ✅ Processing → 🎨 Generating → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
-
-            images = await self.client.generate_image(prompt=prompt, style=style, count=count, seed=seed, format=format)
+        async with self._progress(interaction, "🎨 Image Generation Progress", _IMAGINE_STAGES, prompt, "process_imagine") as reporter:
+            await reporter.advance(2)
+            images = await self._generate_cached(prompt, style, count, seed, format)
 
             if not images:
                 await handle_error(interaction, "Failed to generate images.", category=ErrorCategory.API)
                 return
 
-            # Update to finalizing
-            embed.description = f"✅ Queued → ✅ Processing → ✅ Generating → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
-
-            raw_files = process_image_sources(images[:count], "generated", count, format)
-            files = [f for f in raw_files if f]
+            await reporter.advance(3)
+            files = await render_files(images[:count], "generated", count, format)
 
             if not files:
                 await handle_error(interaction, "Failed to process images.", category=ErrorCategory.PROCESSING)
                 return
 
             # Complete progress — include the full prompt in the embed so it's visible
-            embed.description = (
-                f"✅ Queued → ✅ Processing → ✅ Generating → ✅ Finalizing\n\n"
-                f"**Complete!** Generated {len(files)} image{'s' if len(files) > 1 else ''}\n\n"
-                f"**Prompt:** {prompt}"
-            )
-            embed.color = 0x00ff00
-
-            # Add iteration buttons and include generated images so buttons can reference them
+            # Add iteration buttons and include generated images so buttons can reference them;
+            # the images are attached to the same edit rather than sent as a second message
             view = ImageIterationView(prompt, style, seed, format, images=images[:count])
-            await progress_msg.edit(embed=embed, view=view)
-
-            # Send just the image files without additional embed
-            await interaction.followup.send(files=files)
-
-        except Exception as e:
-            logger.error(f"Error in queue process_imagine: {e}", exc_info=True)
-            await handle_error(interaction, "Unexpected error occurred.", category=ErrorCategory.INTERNAL)
+            await self._deliver(reporter, f"**Complete!** Generated {len(files)} image{'s' if len(files) > 1 else ''}", prompt=prompt, view=view, files=files)
+
+    async def _materialize_source(self, src: Any) -> Union[str, ValidatedImage]:
+        """Turn a local path, discord.File or GeneratedImage into something prepare_image_for_api accepts."""
+        # If already a local file path, just reuse it
+        if isinstance(src, (str, Path)):
+            if not os.path.exists(str(src)):
+                raise FileNotFoundError(f"Local source path not found: {src}")
+            return str(src)
+
+        if isinstance(src, discord.File):
+            # In-memory files hand over their buffer directly, leaving the stream position alone
+            if isinstance(src.fp, BytesIO):
+                return ValidatedImage.from_bytes(src.fp.getvalue(), src.filename)
+            # Otherwise discord.File.fp is some other file-like object
+            try:
+                src.fp.seek(0)
+            except Exception:
+                pass
+            return ValidatedImage.from_bytes(src.fp.read(), src.filename)
+
+        # GeneratedImage-like handling; multi-MB base64 payloads are decoded (and hashed) off the event loop
+        if getattr(src, 'base64', None):
+            return await self._decode_cached(src.base64)
+        if getattr(src, 'url', None):
+            if src.url.startswith('data:'):
+                return await self._decode_cached(src.url)
+            return await asyncio.to_thread(ValidatedImage.from_bytes, await self._download(src.url))
+        raise ValueError(f"Unknown generated source type: {type(src)}")
+
+    async def _decode_cached(self, b64: str) -> ValidatedImage:
+        """Decode a base64 payload, reusing the result when the same payload was decoded recently."""
+        key = await asyncio.to_thread(lambda: hashlib.blake2b(b64.encode('ascii'), digest_size=16).hexdigest())
+        image = self._decoded.get(key)
+        if image is not None:
+            self._decoded.move_to_end(key)
+            return image
+        image = await asyncio.to_thread(_decode_b64_image, b64)
+        self._decoded[key] = image
+        while len(self._decoded) > _DECODED_CACHE_SIZE:
+            self._decoded.popitem(last=False)
+        return image
+
+    async def _download(self, url: str) -> bytes:
+        """Stream a remote image into one buffer, aborting as soon as it exceeds MAX_IMAGE_MB."""
+        max_bytes = int(config.max_image_mb * 1024 * 1024)
+        # BytesIO.getvalue() hands over its internal buffer, avoiding the full copy bytes(bytearray) would make
+        buffer = BytesIO()
+        async with self._http.stream("GET", url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.aiter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                buffer.write(chunk)
+                if buffer.tell() > max_bytes:
+                    raise ValidationError(f"Source image exceeds {config.max_image_mb} MB.", category="validation")
+        return buffer.getvalue()
 
     async def process_edit(self, item: QueueItem):
         params = item.params
@@ -244,227 +630,80 @@ class AsyncImageQueue:
         mask = params['mask']
         format = params.get('format', 'png')
 
-        # Single progress message starting with queued
-        embed = discord.Embed(
-            title="🖼️ Image Edit Progress",
-            description=f"⏳ Queued → 🔄 Processing → 🎨 Editing → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}",
-            color=0x3498db
-        )
-        progress_msg = await interaction.followup.send(embed=embed)
-
-        try:
-            await asyncio.sleep(0.5)
-
-            # Update to processing
-            embed.description = f"✅ Queued → 🔄 Processing → 🎨 Editing → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
-
-            # If sources are GeneratedImage objects (from our own generation) or discord.File objects,
-            # write them to temp files in CACHE_DIR so the existing pipeline can process them.
-            validated_paths = []
+        async with self._progress(interaction, "🖼️ Image Edit Progress", _EDIT_STAGES, prompt, "process_edit") as reporter:
+            # If sources are GeneratedImage objects (from our own generation), discord.File objects
+            # or local paths, load them into memory so the existing pipeline can process them.
             try:
                 # Quick heuristic: if the first source has attributes like 'base64' or 'url', treat as GeneratedImage
                 first_src = sources[0] if sources else None
             except Exception:
                 first_src = None
 
-            from pathlib import Path as _Path
-            if first_src is not None and (isinstance(first_src, (str, _Path)) or hasattr(first_src, 'base64') or hasattr(first_src, 'url') or isinstance(first_src, discord.File)):
-                # Convert in-memory/generated images to temp files
-                for i, src in enumerate(sources):
-                    temp_path = os.path.join(CACHE_DIR, f"gen_{uuid.uuid4()}_{i}.{format}")
-                    try:
-                        # If already a local file path, just reuse it
-                        if isinstance(src, (str, _Path)):
-                            # validate file exists
-                            if os.path.exists(str(src)):
-                                validated_paths.append(str(src))
-                                continue
-                            else:
-                                raise Exception(f"Local source path not found: {src}")
-
-                        if isinstance(src, discord.File):
-                            # discord.File.fp is a file-like object
-                            try:
-                                src.fp.seek(0)
-                            except Exception:
-                                pass
-                            data = src.fp.read()
-                            with open(temp_path, 'wb') as f:
-                                f.write(data)
-                            validated_paths.append(temp_path)
-                        else:
-                            # GeneratedImage-like handling
-                            if getattr(src, 'base64', None):
-                                b64 = src.base64
-                                if b64.startswith('data:'):
-                                    _, b64 = b64.split(',', 1)
-                                b64 = b64.strip()
-                                missing_padding = len(b64) % 4
-                                if missing_padding:
-                                    b64 += '=' * (4 - missing_padding)
-                                data = base64.b64decode(b64)
-                                with open(temp_path, 'wb') as f:
-                                    f.write(data)
-                                validated_paths.append(temp_path)
-                            elif getattr(src, 'url', None):
-                                if src.url.startswith('data:'):
-                                    _, encoded = src.url.split(',', 1)
-                                    encoded = encoded.strip()
-                                    missing_padding = len(encoded) % 4
-                                    if missing_padding:
-                                        encoded += '=' * (4 - missing_padding)
-                                    data = base64.b64decode(encoded)
-                                else:
-                                    resp = requests.get(src.url, stream=True, timeout=10)
-                                    resp.raise_for_status()
-                                    data = resp.content
-                                with open(temp_path, 'wb') as f:
-                                    f.write(data)
-                                validated_paths.append(temp_path)
-                            else:
-                                # Unknown type; skip
-                                logger.warning(f"Unknown generated source type: {type(src)}")
-                    except Exception as e:
-                        logger.error(f"Failed to convert generated source to temp file: {e}")
-                        # Clean up any partial file
-                        try:
-                            if os.path.exists(temp_path):
-                                os.unlink(temp_path)
-                        except Exception:
-                            pass
-
-                if not validated_paths or len(validated_paths) < len(sources):
-                    raise ValidationError("Some generated sources could not be processed for editing.", category="validation")
+            validated: Sequence[Union[str, ValidatedImage]] = []
+            # discord.Attachment also has a .url, but belongs on the attachment path below
+            if first_src is not None and not isinstance(first_src, discord.Attachment) and (isinstance(first_src, (str, Path)) or hasattr(first_src, 'base64') or hasattr(first_src, 'url') or isinstance(first_src, discord.File)):
+                # Load every source concurrently; results keep the order of `sources`
+                results = await asyncio.gather(*(self._materialize_source(src) for src in sources), return_exceptions=True)
+                failed = [i + 1 for i, result in enumerate(results) if isinstance(result, BaseException)]
+                for i, result in enumerate(results):
+                    if isinstance(result, BaseException):
+                        logger.error(f"Failed to load generated source {i + 1} for editing: {result}")
+                if failed:
+                    raise ValidationError(f"Generated source(s) {', '.join(map(str, failed))} could not be processed for editing.", category="validation")
+                validated = cast(List[Union[str, ValidatedImage]], results)
+
             else:
-                # Fallback: treat sources as regular message attachments and validate/download them
-                all_attachments = sources[::] if not mask else sources + [mask]
-                validated_paths = fetch_and_validate_attachments(all_attachments)
-                if not validated_paths or len(validated_paths) < len(sources):
+                # Fallback: treat sources as regular message attachments and validate/download them.
+                # Invalid attachments are skipped, so anything short of all of them (mask included)
+                # would misalign sources and mask
+                attachments = itertools.chain(sources, (mask,) if mask else ())
+                validated = await fetch_and_validate_attachments_async(attachments)
+                if len(validated) < len(sources) + (1 if mask else 0):
                     raise ValidationError("Some attachments could not be validated. Ensure all are valid PNG/JPG/WebP images <10MB.", category="validation")
 
             # Separate sources and mask
-            source_paths = validated_paths[:len(sources)]
-            mask_path = validated_paths[-1] if mask and len(validated_paths) > len(sources) else None
+            n_sources = len(sources)
+            source_images = validated[:n_sources]
+            mask_image = validated[n_sources] if mask and len(validated) > n_sources else None
 
-            # Prepare for API
-            prepared_sources = [prepare_image_for_api(path) for path in source_paths]
-            prepared_mask = prepare_image_for_api(mask_path) if mask_path else None
-
-            # Update to editing
-            embed.description = f"✅ Queued → ✅ Processing → 🎨 Editing → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
+            # Prepare for API; each source is resized/encoded in parallel off the event loop
+            images_to_prepare = [*source_images, mask_image] if mask_image else source_images
+            prepared = await asyncio.gather(*(asyncio.to_thread(prepare_image_for_api, image) for image in images_to_prepare))
+            prepared_sources = prepared[:len(source_images)]
+            prepared_mask = prepared[-1] if mask_image else None
 
             # Call edit
-            edited_images = await self.client.edit_image(
-                prompt=prompt,
-                sources=[item.get('url', item.get('data')) for item in prepared_sources],
-                mask=prepared_mask.get('url', prepared_mask.get('data')) if prepared_mask else None,
-                format=format
-            )
+            await reporter.advance(2)
+            async with self.backpressure.slot():
+                edited_images = await self.client.edit_image(
+                    prompt=prompt,
+                    sources=[p.url or p.data for p in prepared_sources],
+                    mask=(prepared_mask.url or prepared_mask.data) if prepared_mask else None,
+                    format=format
+                )
 
             if not edited_images:
                 await handle_error(interaction, "Image editing failed.", category=ErrorCategory.API)
                 return
 
-            # Update to finalizing
-            embed.description = f"✅ Queued → ✅ Processing → ✅ Editing → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
-
             # Process generated images
+            await reporter.advance(3)
             logger.debug(f"Processing {len(edited_images)} edited images")
-            raw_files = process_image_sources(edited_images, "edited", len(edited_images), format)
-            files = [f for f in raw_files if f]
+            files = await render_files(edited_images, "edited", len(edited_images), format)
             logger.debug(f"Successfully processed {len(files)} files")
 
             if files:
-                # Complete progress — include the full prompt in the embed so it's visible
-                embed.description = (
-                    f"✅ Queued → ✅ Processing → ✅ Editing → ✅ Finalizing\n\n"
-                    f"**Complete!** Edited {len(files)} image{'s' if len(files) > 1 else ''}\n\n"
-                    f"**Prompt:** {prompt}"
-                )
-                embed.color = 0x00ff00
-
-                # Save the discord.File objects to local temp files so iteration/edit can reuse them reliably
-                saved_paths = []
-                for i, df in enumerate(files):
-                    try:
-                        # df.fp should be a file-like object (BytesIO)
-                        try:
-                            df.fp.seek(0)
-                        except Exception:
-                            pass
-                        data = df.fp.read()
-                        temp_path = os.path.join(CACHE_DIR, f"edited_{uuid.uuid4()}_{i}.{format}")
-                        with open(temp_path, 'wb') as tf:
-                            tf.write(data)
-                        saved_paths.append(temp_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to write edited image to temp file: {e}")
-
-                # Add saved_paths to validated_paths so they are cleaned up at the end
-                if saved_paths:
-                    validated_paths.extend(saved_paths)
-
-                # Attach the same iteration view used for imagine, passing the saved local file paths
+                # Complete progress — include the full prompt in the embed so it's visible,
+                # attach the same iteration view used for imagine (its Edit button re-decodes
+                # the edited images from memory) and the edited images in one edit
                 try:
-                    view = ImageIterationView(prompt, None, None, format, images=saved_paths if saved_paths else edited_images)
-                    await progress_msg.edit(embed=embed, view=view)
+                    view = ImageIterationView(prompt, None, None, format, images=edited_images)
                 except Exception:
-                    await progress_msg.edit(embed=embed)
-
-                # Build new discord.File objects from saved temp paths (avoid sending consumed file-like objects)
-                send_file_objs = []
-                open_files = []
-                try:
-                    if saved_paths:
-                        for p in saved_paths:
-                            fobj = open(p, 'rb')
-                            open_files.append(fobj)
-                            send_file_objs.append(discord.File(fp=fobj, filename=os.path.basename(p)))
-                        await interaction.followup.send(files=send_file_objs)
-                    else:
-                        # Fallback: send original file objects
-                        await interaction.followup.send(files=files)
-                finally:
-                    for f in open_files:
-                        try:
-                            f.close()
-                        except Exception:
-                            pass
+                    view = None
+                await self._deliver(reporter, f"**Complete!** Edited {len(files)} image{'s' if len(files) > 1 else ''}", prompt=prompt, view=view, files=files)
             else:
                 await handle_error(interaction, "Failed to prepare edited image files.", category=ErrorCategory.PROCESSING)
 
-            # Cleanup
-            for path in validated_paths:
-                try:
-                    os.unlink(path)
-                except OSError as e:
-                    logger.warning(f"Failed to delete temp file {path}: {e}")
-
-        except ValidationError as e:
-            # Cleanup temp files on validation error
-            if 'validated_paths' in locals() and validated_paths:
-                for path in validated_paths:
-                    try:
-                        os.unlink(path)
-                    except OSError as cleanup_e:
-                        logger.warning(f"Failed to delete temp file {path}: {cleanup_e}")
-            await handle_error(interaction, str(e), category=e.category, include_suggestion=True)
-        except Exception as e:
-            logger.error(f"Error in queue process_edit: {e}", exc_info=True)
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error details: {str(e)}")
-            # Cleanup temp files on unexpected error
-            if 'validated_paths' in locals() and validated_paths:
-                for path in validated_paths:
-                    try:
-                        os.unlink(path)
-                    except OSError as cleanup_e:
-                        logger.warning(f"Failed to delete temp file {path}: {cleanup_e}")
-            await handle_error(interaction, "Unexpected error occurred.", category=ErrorCategory.INTERNAL)
-
     async def process_blend(self, item: QueueItem):
         params = item.params
         interaction = item.interaction
@@ -473,97 +712,59 @@ class AsyncImageQueue:
         strength = params['strength']
         format = params.get('format', 'png')
 
-        # Single progress message starting with queued
-        embed = discord.Embed(
-            title="🌀 Image Blend Progress",
-            description=f"⏳ Queued → 🔄 Processing → 🎨 Blending → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}",
-            color=0x3498db
-        )
-        progress_msg = await interaction.followup.send(embed=embed)
-
-        try:
-            await asyncio.sleep(0.5)
-
-            # Update to processing
-            embed.description = f"✅ Queued → 🔄 Processing → 🎨 Blending → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
-
-            # Fetch and validate all attachments
-            validated_paths = fetch_and_validate_attachments(sources)
-            if not validated_paths or len(validated_paths) < len(sources):
+        async with self._progress(interaction, "🌀 Image Blend Progress", _BLEND_STAGES, prompt, "process_blend") as reporter:
+            # Fetch and validate all attachments into memory
+            validated = await fetch_and_validate_attachments_async(sources)
+            if not validated or len(validated) < len(sources):
                 raise ValidationError("Some attachments could not be validated. Ensure all are valid PNG/JPG/WebP images <10MB.", category="validation")
 
-            # Prepare for API
-            prepared_sources = [prepare_image_for_api(path) for path in validated_paths]
-
-            # Update to blending
-            embed.description = f"✅ Queued → ✅ Processing → 🎨 Blending → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
+            # Prepare for API; each source is resized/encoded in parallel off the event loop
+            prepared_sources = await asyncio.gather(*(asyncio.to_thread(prepare_image_for_api, image) for image in validated))
 
             # Call blend
-            blended_images = await self.client.blend_images(
-                prompt=prompt,
-                sources=[item.get('url', item.get('data')) for item in prepared_sources],
-                strength=strength,
-                format=format
-            )
+            await reporter.advance(2)
+            async with self.backpressure.slot():
+                blended_images = await self.client.blend_images(
+                    prompt=prompt,
+                    sources=[p.url or p.data for p in prepared_sources],
+                    strength=strength,
+                    format=format
+                )
 
             if not blended_images:
                 await handle_error(interaction, "Blending failed.", category=ErrorCategory.API)
                 return
 
-            # Update to finalizing
-            embed.description = f"✅ Queued → ✅ Processing → ✅ Blending → 🔧 Finalizing\n\n**Prompt:** {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
-            await progress_msg.edit(embed=embed)
-
             # Process generated images
-            raw_files = process_image_sources(blended_images, "blended", len(blended_images), format)
-            files = [f for f in raw_files if f]
+            await reporter.advance(3)
+            files = await render_files(blended_images, "blended", len(blended_images), format)
 
             if files:
-                # Complete progress
-                embed.description = f"✅ Queued → ✅ Processing → ✅ Blending → ✅ Finalizing\n\n**Complete!** Blended {len(files)} image{'s' if len(files) > 1 else ''}"
-                embed.color = 0x00ff00
-                await progress_msg.edit(embed=embed)
-
-                # Send just the image files without additional embed
-                await interaction.followup.send(files=files)
+                # Complete progress, attaching the images to the same edit
+                await self._deliver(reporter, f"**Complete!** Blended {len(files)} image{'s' if len(files) > 1 else ''}", files=files)
             else:
                 await handle_error(interaction, "Failed to prepare blended image files.", category=ErrorCategory.PROCESSING)
 
-            # Cleanup
-            import os
-            for path in validated_paths:
-                try:
-                    os.unlink(path)
-                except OSError as e:
-                    logger.warning(f"Failed to delete temp file {path}: {e}")
-
-        except ValidationError as e:
-            # Cleanup temp files on validation error
-            if 'validated_paths' in locals() and validated_paths:
-                import os
-                for path in validated_paths:
-                    try:
-                        os.unlink(path)
-                    except OSError as cleanup_e:
-                        logger.warning(f"Failed to delete temp file {path}: {cleanup_e}")
-            await handle_error(interaction, str(e), category=e.category, include_suggestion=True)
-        except Exception as e:
-            logger.error(f"Error in queue process_blend: {e}", exc_info=True)
-            # Cleanup temp files on unexpected error
-            if 'validated_paths' in locals() and validated_paths:
-                import os
-                for path in validated_paths:
-                    try:
-                        os.unlink(path)
-                    except OSError as cleanup_e:
-                        logger.warning(f"Failed to delete temp file {path}: {cleanup_e}")
-            await handle_error(interaction, "Unexpected error occurred.", category=ErrorCategory.INTERNAL)
-
-# Initialize global queue
-def initialize_queue():
-    global image_processing_queue
-    if image_processing_queue is None:
-        image_processing_queue = AsyncImageQueue()
-    return image_processing_queue
\ No newline at end of file
+# Process-wide queue, created once at bot startup
+_queue: Optional[AsyncImageQueue] = None
+
+def initialize_queue() -> AsyncImageQueue:
+    """Create the process-wide queue and its workers; later calls return the same queue."""
+    global _queue
+    if _queue is None:
+        _queue = AsyncImageQueue()
+        # Prune expired cache files (e.g. persisted seeded results) on the executor, not the event loop
+        _spawn_background(asyncio.to_thread(cleanup_cache))
+    return _queue
+
+async def close_queue() -> None:
+    """Drain and shut down the process-wide queue, if one was created."""
+    global _queue
+    if _queue is not None:
+        await _queue.aclose()
+        _queue = None
+
+def get_queue() -> AsyncImageQueue:
+    """Return the queue created by initialize_queue() at startup."""
+    assert _queue is not None, "initialize_queue() must be called before handling interactions"
+    return _queue
\ No newline at end of file
@@ -1,6 +1,17 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import operator
 import time
-from collections import defaultdict, deque
-from functools import wraps
+from collections import defaultdict
+from functools import lru_cache, wraps
+
+# Discord.py slash commands receive the interaction first; its user id (an int) keys the limiter
+_interaction_user_id = operator.attrgetter('user.id')
+
+# Monotonic clock: immune to NTP/DST jumps that would starve or over-admit users
+_now = time.monotonic
 
 
 class RateLimitExceeded(Exception):
@@ -9,6 +20,9 @@ class RateLimitExceeded(Exception):
 
 
 class RateLimiter:
+    # Long-lived singleton read on every command; slots keep attribute access off the instance dict
+    __slots__ = ('_cache', 'default_limit', 'default_window', '_command_limits', '_get_limit_window', '_last_seen', '_expiry_heap', '_heap_seq')
+
     def __init__(self, default_limit=10, default_window=60):
         """
         Initialize the rate limiter.
@@ -17,10 +31,17 @@ class RateLimiter:
             default_limit (int): Default number of requests allowed per window.
             default_window (int): Default time window in seconds.
         """
-        self._cache = defaultdict(dict)  # user_id -> {command -> deque of timestamps}
+        self._cache = defaultdict(dict)  # user_id -> {command -> [tokens, last_ts]}
         self.default_limit = default_limit
         self.default_window = default_window
         self._command_limits = {}  # command -> (limit, window)
+        # Resolved (limit, window) per command; cleared whenever a command limit changes
+        self._get_limit_window = lru_cache(maxsize=128)(self._resolve_limit_window)
+        # Expiry index for cleanup_inactive_users: one heap entry per user, ordered by the
+        # activity time it was pushed with; _last_seen holds the true latest activity
+        self._last_seen = {}  # user_id -> last check timestamp
+        self._expiry_heap = []  # (timestamp, seq, user_id)
+        self._heap_seq = itertools.count()  # tie-breaker so user ids are never compared
 
     def set_command_limit(self, command, limit, window=None):
         """
@@ -34,35 +55,42 @@ class RateLimiter:
         if window is None:
             window = self.default_window
         self._command_limits[command] = (limit, window)
+        self._get_limit_window.cache_clear()
 
     def check_rate_limit(self, user_id, command, current_time=None):
         """
-        Check if the action is within rate limits.
+        Check if the action is within rate limits, consuming one request if it is.
+
+        Each (user, command) pair is a token bucket holding up to `limit` tokens
+        and refilling at `limit / window` tokens per second, so a check is O(1)
+        and a pair costs two floats rather than a log of timestamps.
 
         Args:
-            user_id (str): User identifier.
+            user_id (int | str): User identifier (Discord user ids are ints).
             command (str): Command name.
-            current_time (float, optional): Current timestamp. If None, uses time.time().
+            current_time (float, optional): Current monotonic timestamp. If None, uses time.monotonic().
 
         Returns:
             bool: True if within limits, False if exceeded.
         """
         if current_time is None:
-            current_time = time.time()
+            current_time = _now()
 
-        if command not in self._cache[user_id]:
-            self._cache[user_id][command] = deque()
-
-        times = self._cache[user_id][command]
-        times.append(current_time)
+        if user_id not in self._last_seen:
+            heapq.heappush(self._expiry_heap, (current_time, next(self._heap_seq), user_id))
+        self._last_seen[user_id] = current_time
 
         limit, window = self._get_limit_window(command)
+        entry = self._cache[user_id].get(command)
+        if entry is None:
+            entry = self._cache[user_id][command] = [float(limit), current_time]
 
-        # Remove timestamps outside the window
-        while times and times[0] < current_time - window:
-            times.popleft()
-
-        return len(times) <= limit
+        tokens = self._refill(entry, limit, window, current_time)
+        if tokens < 1:
+            return False
+        entry[0] = tokens - 1
+        entry[1] = current_time
+        return True
 
     def get_remaining_requests(self, user_id, command, current_time=None):
         """
@@ -71,89 +99,100 @@ class RateLimiter:
         Args:
             user_id (str): User identifier.
             command (str): Command name.
-            current_time (float, optional): Current timestamp.
+            current_time (float, optional): Current monotonic timestamp.
 
         Returns:
             int: Number of remaining requests.
         """
         if current_time is None:
-            current_time = time.time()
+            current_time = _now()
 
-        times = self._cache.get(user_id, {}).get(command, deque())
         limit, window = self._get_limit_window(command)
-
-        # Clean old timestamps
-        cleaned_times = [t for t in times if t >= current_time - window]
-
-        # Update cache
-        self._cache[user_id][command] = deque(cleaned_times)
-
-        used = len(cleaned_times)
-        return max(0, limit - used)
+        entry = self._lookup(user_id, command)
+        if entry is None:
+            return limit
+        return int(self._refill(entry, limit, window, current_time))
 
     def get_reset_time(self, user_id, command, current_time=None):
         """
-        Get the time when the rate limit will reset.
+        Get the time when the next request will be allowed.
 
         Args:
             user_id (str): User identifier.
             command (str): Command name.
-            current_time (float, optional): Current timestamp.
+            current_time (float, optional): Current monotonic timestamp.
 
         Returns:
-            float: Reset timestamp.
+            float: Reset timestamp, on the monotonic clock.
         """
         if current_time is None:
-            current_time = time.time()
+            current_time = _now()
 
-        times = self._cache.get(user_id, {}).get(command, deque())
         limit, window = self._get_limit_window(command)
+        entry = self._lookup(user_id, command)
+        if entry is None:
+            return current_time
 
-        if not times:
+        tokens = self._refill(entry, limit, window, current_time)
+        if tokens >= 1:
             return current_time
+        return current_time + (1 - tokens) * window / limit
 
-        if len(times) < limit:
-            return current_time + window
+    def _lookup(self, user_id, command):
+        """Return the bucket for (user, command) without creating entries or sentinel dicts."""
+        commands = self._cache.get(user_id)
+        return commands.get(command) if commands else None
 
-        # Find the earliest timestamp that would still be within limit
-        return times[len(times) - limit] + window
+    @staticmethod
+    def _refill(entry, limit, window, current_time):
+        """Tokens in a [tokens, last_ts] bucket at `current_time`, capped at `limit`."""
+        tokens, last_ts = entry
+        return min(float(limit), tokens + max(0.0, current_time - last_ts) * limit / window)
 
-    def _get_limit_window(self, command):
+    def _resolve_limit_window(self, command):
         """Get limit and window for a command, using defaults if not set."""
         return self._command_limits.get(command, (self.default_limit, self.default_window))
 
-    def cleanup_inactive_users(self, threshold_hours=24):
+    async def cleanup_inactive_users(self, threshold_hours=24, yield_every=500):
         """
         Clean up cache for users who haven't made requests recently.
 
+        Only heap entries older than the threshold are visited, so the cost is
+        proportional to the users considered rather than all users. An entry whose
+        user has been active since it was pushed is re-pushed at that later time.
+        Control returns to the event loop every `yield_every` users so a large
+        cleanup can't delay the gateway heartbeat.
+
         Args:
             threshold_hours (int): Remove users inactive longer than this (hours).
+            yield_every (int): Users to process between yields to the event loop.
         """
-        current_time = time.time()
-        threshold = current_time - (threshold_hours * 3600)
-        to_remove = []
-
-        for user_id, commands in list(self._cache.items()):
-            user_active = False
-            for cmd, times in list(commands.items()):
-                # Keep recent timestamps
-                recent_times = [t for t in times if t >= threshold]
-                if recent_times:
-                    self._cache[user_id][cmd] = deque(recent_times)
-                    user_active = True
-                else:
-                    del self._cache[user_id][cmd]
-            if not user_active:
-                to_remove.append(user_id)
-
-        for user_id in to_remove:
-            del self._cache[user_id]
+        threshold = _now() - (threshold_hours * 3600)
+        heap = self._expiry_heap
+        visited = 0
+        while heap and heap[0][0] < threshold:
+            visited += 1
+            if visited % yield_every == 0:
+                await asyncio.sleep(0)
+                continue  # The heap may have changed while we were suspended
+            _, _, user_id = heapq.heappop(heap)
+            last_seen = self._last_seen.get(user_id)
+            if last_seen is None:
+                continue
+            if last_seen < threshold:
+                del self._last_seen[user_id]
+                self._cache.pop(user_id, None)
+            else:
+                heapq.heappush(heap, (last_seen, next(self._heap_seq), user_id))
 
 
 def rate_limited(rate_limiter, user_id_param='user_id', command_name=None):
     """
     Decorator to apply rate limiting to command functions.
 
+    How the user id is found and whether the wrapper is async are decided once,
+    at decoration time, so each call only extracts the id and checks the limit.
+
     Args:
         rate_limiter (RateLimiter): Rate limiter instance.
         user_id_param (str): Name of the parameter containing user_id.
@@ -163,77 +202,57 @@ def rate_limited(rate_limiter, user_id_param='user_id', command_name=None):
         Decorated function.
     """
     def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            wrapper.__globals__.update(func.__globals__)  # Ensure original globals are available
-            # Extract user_id from parameters
-            user_id = None
-            if user_id_param in kwargs:
-                user_id = kwargs[user_id_param]
-            else:
-                # Handle Discord.py slash command interactions
-                if args and hasattr(args[0], 'user'):  # Discord.py slash command interaction
-                    user_id = str(args[0].user.id)
-                elif args and hasattr(args[1], 'author'):  # Discord.py message command style  
-                    user_id = str(args[1].author.id)
-                else:
-                    raise ValueError(f"Could not extract user_id from {user_id_param}")
+        cmd_name = command_name or func.__name__
+        params = list(inspect.signature(func).parameters)
 
+        index = params.index(user_id_param) if user_id_param in params else None
+
+        def user_id_from_param(args, kwargs):
+            if user_id_param in kwargs:
+                return kwargs[user_id_param]
+            return args[index] if index is not None and index < len(args) else None
+
+        def user_id_from_args(args, kwargs):
+            # Slash commands pass the interaction first, message commands (self, message);
+            # otherwise the first argument is the id itself. Ids are ints on every path
+            # so one user never ends up with two buckets.
+            if not args:
+                return None
+            if hasattr(args[0], 'user'):
+                return int(_interaction_user_id(args[0]))
+            if len(args) > 1 and hasattr(args[1], 'author'):
+                return int(args[1].author.id)
+            try:
+                return int(args[0])
+            except (TypeError, ValueError):
+                raise ValueError(f"Could not extract user_id from {user_id_param}") from None
+
+        get_user_id = user_id_from_param if index is not None else user_id_from_args
+
+        def check(args, kwargs):
+            user_id = get_user_id(args, kwargs)
             if user_id is None:
-                # Fallback or error
                 raise ValueError("User ID not found")
-
-            cmd_name = command_name or func.__name__
-
             if not rate_limiter.check_rate_limit(user_id, cmd_name):
                 remaining = rate_limiter.get_remaining_requests(user_id, cmd_name)
                 reset_time = rate_limiter.get_reset_time(user_id, cmd_name)
-                reset_in = int(reset_time - time.time())
+                reset_in = int(reset_time - _now())
                 raise RateLimitExceeded(
                     f"Rate limit exceeded. You have {remaining} requests remaining. "
                     f"Try again in {reset_in} seconds."
                 )
 
-            # If async, await; else call synchronously
-            if hasattr(func, '__call__'):
-                return await func(*args, **kwargs)
-            else:
-                return func(*args, **kwargs)
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            check(args, kwargs)
+            return await func(*args, **kwargs)
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            # Similar logic but for sync functions
-            user_id = kwargs.get(user_id_param)
-            if user_id is None and args:
-                # Assuming first arg or adjust
-                user_id = str(args[0])  # Placeholder
-
-            if user_id is None:
-                raise ValueError("User ID not found")
-
-            cmd_name = command_name or func.__name__
-
-            if not rate_limiter.check_rate_limit(user_id, cmd_name):
-                remaining = rate_limiter.get_remaining_requests(user_id, cmd_name)
-                reset_time = rate_limiter.get_reset_time(user_id, cmd_name)
-                reset_in = int(reset_time - time.time())
-                raise RateLimitExceeded(
-                    f"Rate limit exceeded. You have {remaining} requests remaining. "
-                    f"Try again in {reset_in} seconds."
-                )
-
+            check(args, kwargs)
             return func(*args, **kwargs)
 
-        # Return appropriate wrapper based on function type
-        if hasattr(func, '__call__') and hasattr(func, '__code__'):
-            # Check if async by looking at co_flags
-            import inspect
-            if inspect.iscoroutinefunction(func):
-                return wrapper
-            else:
-                return sync_wrapper
-        else:
-            return sync_wrapper
+        return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
 
     return decorator
 
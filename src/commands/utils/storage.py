@@ -8,12 +8,12 @@ that requires long-term persistence, as files may be removed after RETENTION_HOU
 """
 import os
 import logging
+import itertools
 import time
-import uuid
 import shutil
+import stat
 from pathlib import Path
 from typing import Optional, Union
-from threading import RLock
 
 from .logging import setup_logger
 from ...utils.config import config
@@ -27,29 +27,46 @@ DEFAULT_RETENTION_HOURS = 1.0
 
 # Configuration from centralized config
 RETENTION_HOURS = config.retention_hours
+_RETENTION_SEC = RETENTION_HOURS * 3600
 CACHE_DIR_ENV = str(config.cache_dir)
 
-# Global lock for thread safety during cache operations
-cache_lock = RLock()
-
 # Helper: Ensure directory exists
 def ensure_dir(path: Union[Path, str]):
     """Ensure the directory exists, creating it if necessary."""
     Path(path).mkdir(parents=True, exist_ok=True)
 
+# Resolved (and created) on first use, so cache reads/writes don't stat or mkdir every time
+_cache_dir: Optional[Path] = None
+
 # Helper: Get the cache directory
 def get_cache_dir() -> Path:
     """Get the cache directory path, ensuring it exists."""
-    cache_dir = Path.cwd() / CACHE_DIR_ENV
-    ensure_dir(cache_dir)
-    return cache_dir
+    global _cache_dir
+    if _cache_dir is None:
+        cache_dir = Path.cwd() / CACHE_DIR_ENV
+        ensure_dir(cache_dir)
+        _cache_dir = cache_dir
+    return _cache_dir
+
+def reset_cache_dir() -> None:
+    """Forget the resolved cache directory (e.g. after changing the working directory in tests)."""
+    global _cache_dir
+    _cache_dir = None
+
+# Temp names are unique per process (pid + start time) and per call (counter),
+# which avoids a getrandom() syscall and uuid formatting for every file
+_temp_prefix = f"{os.getpid()}_{int(time.time())}"
+_temp_seq = itertools.count()
+
+def unique_name(suffix: str = '') -> str:
+    """Return a file name that is unique across this process and concurrent ones."""
+    return f"{_temp_prefix}_{next(_temp_seq)}{suffix}"
 
 # Helper: Create a temp file in the cache directory
 def create_temp_file(suffix: str = '.png') -> Path:
     """Create a unique temp file path in the cache directory."""
     cache_dir = get_cache_dir()
-    unique_name = f"{uuid.uuid4()}{suffix}"
-    return cache_dir / unique_name
+    return cache_dir / unique_name(suffix)
 
 # Helper: Clean up old cache files based on age
 def cleanup_cache(age_hours: Optional[float] = None) -> int:
@@ -60,18 +77,25 @@ def cleanup_cache(age_hours: Optional[float] = None) -> int:
     now = time.time()
     removed_count = 0
 
-    with cache_lock:
-        for file_path in cache_dir.iterdir():
-            if file_path.is_file():
-                try:
-                    file_mtime = file_path.stat().st_mtime
-                    if now - file_mtime > age_hours * 3600:
-                        file_path.unlink()
-                        removed_count += 1
-                        logger.debug(f"Cleaned up old cache file: {file_path}")
-                except (OSError, PermissionError) as e:
-                    logger.warning(f"Could not remove {file_path}: {e}")
-                    continue  # Skip if permission denied
+    # One scandir pass picks the expired files; DirEntry caches its type from the scan and
+    # lstat result, so no Path objects or repeated stat calls are made per entry
+    cutoff = now - age_hours * 3600
+    expired = []
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    expired.append(entry.path)
+            except OSError:
+                continue  # Removed or unreadable since the scan started
+    for path in expired:
+        try:
+            os.unlink(path)
+            removed_count += 1
+            logger.debug(f"Cleaned up old cache file: {path}")
+        except (OSError, PermissionError) as e:
+            logger.warning(f"Could not remove {path}: {e}")
+            continue  # Skip if permission denied
 
     logger.debug(f"Cleanup completed: {removed_count} files removed")
     return removed_count
@@ -82,15 +106,22 @@ def cache_image(image_data: bytes, filename: str) -> Path:
     cache_dir = get_cache_dir()
     cached_path = cache_dir / filename
 
-    with cache_lock:
+    # Write to a private temp name, then rename over the target: the rename is atomic,
+    # so concurrent writers (threads or processes) never interleave and readers never
+    # see a partially written file
+    tmp_path = cached_path.with_name(f"{cached_path.name}.{unique_name('.tmp')}")
+    try:
+        tmp_path.write_bytes(image_data)
+        os.replace(tmp_path, cached_path)
+        logger.debug(f"Cached image to {cached_path}")
+        return cached_path
+    except (OSError, PermissionError) as e:
         try:
-            with open(cached_path, 'wb') as f:
-                f.write(image_data)
-            logger.debug(f"Cached image to {cached_path}")
-            return cached_path
-        except (OSError, PermissionError) as e:
-            logger.error(f"Failed to cache image {filename}: {e}")
-            raise IOError(f"Could not write to cache: {e}") from e
+            tmp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+        logger.error(f"Failed to cache image {filename}: {e}")
+        raise IOError(f"Could not write to cache: {e}") from e
 
 # Cache: Get cached image path
 def get_cached_image(filename: str) -> Optional[Path]:
@@ -110,12 +141,14 @@ def is_cached_recent(filename: str) -> bool:
     cache_dir = get_cache_dir()
     cached_path = cache_dir / filename
 
-    if cached_path.exists() and cached_path.is_file():
-        file_mtime = cached_path.stat().st_mtime
-        now = time.time()
-        if now - file_mtime <= RETENTION_HOURS * 3600:
-            logger.debug(f"Cached image {filename} is recent")
-            return True
+    # One stat answers existence, type and age
+    try:
+        st = cached_path.stat()
+    except OSError:
+        st = None
+    if st is not None and stat.S_ISREG(st.st_mode) and st.st_mtime >= time.time() - _RETENTION_SEC:
+        logger.debug(f"Cached image {filename} is recent")
+        return True
 
     logger.debug(f"Cached image {filename} is not recent or does not exist")
     return False
\ No newline at end of file
@@ -1,8 +1,8 @@
-from enum import Enum
+from enum import StrEnum
 
 
-class Style(Enum):
-    """Enum for image generation styles."""
+class Style(StrEnum):
+    """Enum for image generation styles; members are plain strings ('anime' == Style.ANIME)."""
 
     PHOTOREALISTIC = "photorealistic"
     ANIME = "anime"
@@ -6,16 +6,25 @@ It exposes endpoints for health checks and metrics on port 8000.
 """
 
 import asyncio
+import itertools
 import logging
 import time
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 import httpx
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+try:
+    from fastapi.responses import ORJSONResponse
+    import orjson  # noqa: F401  (ORJSONResponse imports it lazily)
+    ResponseClass = ORJSONResponse
+except ImportError:
+    ResponseClass = JSONResponse  # Fall back to the stdlib json encoder
+
 from .utils.config import config
 from .commands.utils.openrouter import OpenRouterClient
 from .commands.utils.storage import get_cache_dir
@@ -27,7 +36,44 @@ logger = setup_logger(__name__)
 # Global variables for metrics
 app_start_time = time.time()
 request_counter = 0
+# next() on a count is atomic, unlike a read-modify-write of request_counter
+_request_ids = itertools.count(1)
+
+# Seconds a health check result is reused; probes and scrapers polling every few
+# seconds then share one upstream call instead of each hitting OpenRouter
+HEALTH_CHECK_TTL = 10.0
+_check_results: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_check_locks: Dict[str, asyncio.Lock] = {}
+
+# Upper bound on any single probe, so a hung upstream degrades one check
+# instead of stalling the whole response
+PROBE_TIMEOUT = 2.5
+
+# A writable cache dir rarely stops being writable, so a passing write probe is
+# trusted for this long; failures are re-probed on every check
+CACHE_STORAGE_OK_TTL = 60.0
+_cache_storage_ok_until = 0.0
 
+# Pooled client for OpenRouter probes, so repeated checks reuse a warm TLS connection
+_probe_client: Optional[httpx.AsyncClient] = None
+
+def _get_probe_client() -> httpx.AsyncClient:
+    """Return the shared probe client, creating it on first use."""
+    global _probe_client
+    if _probe_client is None or _probe_client.is_closed:
+        _probe_client = httpx.AsyncClient(
+            base_url=config.openrouter_base_url,
+            timeout=10.0,
+            headers={
+                "Authorization": f"Bearer {config.openrouter_api_key}",
+                "Content-Type": "application/json",
+            },
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+        )
+    return _probe_client
+
+# Response shapes, used for the OpenAPI schema only; endpoints return plain
+# dicts so scheduled probes skip Pydantic validation
 # Health Status Model
 class HealthStatus(BaseModel):
     status: str  # "ok", "degraded", "unhealthy"
@@ -47,6 +93,10 @@ async def lifespan(app: FastAPI):
     logger.info("Health check server starting up")
     yield
     logger.info("Health check server shutting down")
+    global _probe_client
+    if _probe_client is not None:
+        await _probe_client.aclose()
+        _probe_client = None
 
 # Create FastAPI app
 app = FastAPI(
@@ -54,14 +104,16 @@ app = FastAPI(
     description="Health monitoring and metrics for gemini-nano-banana-discord-bot",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ResponseClass,
 )
 
 # Middleware to count requests
 @app.middleware("http")
 async def count_requests(request, call_next):
     global request_counter
-    request_counter += 1
-    logger.debug(f"Request count: {request_counter}")
+    request_counter = next(_request_ids)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Request count: %d", request_counter)
     return await call_next(request)
 
 # Health Check Functions
@@ -85,26 +137,24 @@ async def check_openrouter_api() -> Dict[str, Any]:
         if not config.openrouter_api_key:
             return {"status": "unhealthy", "message": "OpenRouter API key not configured"}
 
-        # Test API key by making a small request
-        # We'll make a minimal request to check authentication
-        headers = {
-            "Authorization": f"Bearer {config.openrouter_api_key}",
-            "Content-Type": "application/json",
-        }
-        async with httpx.AsyncClient(timeout=10.0, headers=headers) as client:
-            response = await client.get(f"{config.openrouter_base_url}/models")
-            if response.status_code == 200:
-                return {"status": "ok", "message": "API key valid"}
-            elif response.status_code == 401:
-                return {"status": "unhealthy", "message": "Invalid API key"}
-            else:
-                return {"status": "degraded", "message": f"API returned {response.status_code}"}
+        # /auth/key answers with a few bytes describing the key, unlike the
+        # full /models catalogue; only the status code is inspected
+        response = await _get_probe_client().get("/auth/key")
+        if response.status_code == 200:
+            return {"status": "ok", "message": "API key valid"}
+        elif response.status_code == 401:
+            return {"status": "unhealthy", "message": "Invalid API key"}
+        else:
+            return {"status": "degraded", "message": f"API returned {response.status_code}"}
     except Exception as e:
         logger.error(f"OpenRouter API check failed: {e}")
         return {"status": "unhealthy", "message": str(e)}
 
 async def check_cache_storage() -> Dict[str, Any]:
     """Check cache storage status."""
+    global _cache_storage_ok_until
+    if time.monotonic() < _cache_storage_ok_until:
+        return {"status": "ok", "message": "Cache storage accessible"}
     try:
         cache_dir = get_cache_dir()
         if not cache_dir.exists():
@@ -116,6 +166,7 @@ async def check_cache_storage() -> Dict[str, Any]:
         test_file.write_text("test")
         test_file.unlink()
 
+        _cache_storage_ok_until = time.monotonic() + CACHE_STORAGE_OK_TTL
         return {"status": "ok", "message": "Cache storage accessible"}
     except Exception as e:
         logger.error(f"Cache storage check failed: {e}")
@@ -126,14 +177,38 @@ async def check_database() -> Dict[str, Any]:
     # No database configured in current setup
     return {"status": "ok", "message": "No database configured"}
 
-@app.get("/healthz", response_model=HealthStatus)
-async def healthz():
-    """Basic health check endpoint."""
+async def _cached(name: str, check: Callable[[], Awaitable[Dict[str, Any]]], ttl: float = HEALTH_CHECK_TTL) -> Dict[str, Any]:
+    """Return `check`'s result, reusing it for `ttl` seconds; concurrent misses share one call."""
+    cached = _check_results.get(name)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+    lock = _check_locks.setdefault(name, asyncio.Lock())
+    async with lock:
+        # Another request may have refreshed it while we waited for the lock
+        cached = _check_results.get(name)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        result = await check()
+        _check_results[name] = (time.monotonic(), result)
+        return result
+
+async def _bounded(check: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Run one check under PROBE_TIMEOUT; a timeout is degraded, an error unhealthy."""
+    try:
+        async with asyncio.timeout(PROBE_TIMEOUT):
+            return await check()
+    except TimeoutError:
+        return {"status": "degraded", "message": "probe timeout"}
+    except Exception as e:
+        return {"status": "unhealthy", "message": str(e)}
+
+async def _run_probes() -> Dict[str, Any]:
+    """Run every health check once and fold the results into a snapshot."""
     results = await asyncio.gather(
-        check_bot_connectivity(),
-        check_openrouter_api(),
-        check_cache_storage(),
-        check_database()
+        _bounded(check_bot_connectivity),
+        _bounded(check_openrouter_api),
+        _bounded(check_cache_storage),
+        _bounded(check_database),
     )
 
     # Determine overall status
@@ -144,49 +219,52 @@ async def healthz():
     else:
         overall_status = "ok"
 
-    return HealthStatus(
-        status=overall_status,
-        details={
+    return {
+        "status": overall_status,
+        "details": {
             "bot_connectivity": results[0],
             "openrouter_api": results[1],
             "cache_storage": results[2],
             "database": results[3]
-        }
-    )
+        },
+    }
+
+async def probe_snapshot() -> Dict[str, Any]:
+    """Return the latest probe snapshot shared by /healthz, /ready and /metrics."""
+    return await _cached("snapshot", _run_probes)
 
-@app.get("/ready", response_model=HealthStatus)
+@app.get("/healthz", responses={200: {"model": HealthStatus}})
+async def healthz():
+    """Basic health check endpoint."""
+    snapshot = await probe_snapshot()
+    return {"status": snapshot["status"], "details": snapshot["details"]}
+
+@app.get("/ready", responses={200: {"model": HealthStatus}, 503: {"model": HealthStatus}})
 async def ready():
-    """Readiness check endpoint - more thorough than healthz."""
-    # For simplicity, use same as healthz but could be more detailed
-    return await healthz()
+    """Readiness check endpoint - stricter than healthz, a degraded check means not ready (503)."""
+    snapshot = await probe_snapshot()
+    if snapshot["status"] != "ok":
+        # Readiness probes only look at the status code
+        return ResponseClass({"status": "unhealthy", "details": snapshot["details"]}, status_code=503)
+    return {"status": "ok", "details": snapshot["details"]}
 
-@app.get("/metrics", response_model=Metrics)
+@app.get("/metrics", responses={200: {"model": Metrics}})
 async def metrics():
     """Metrics endpoint."""
     uptime = time.time() - app_start_time
 
-    return Metrics(
-        uptime_seconds=uptime,
-        requests_processed=request_counter,
-        health_checks=await get_health_status_summary()
-    )
+    return {
+        "uptime_seconds": uptime,
+        "requests_processed": request_counter,
+        "health_checks": await get_health_status_summary()
+    }
 
 async def get_health_status_summary() -> Dict[str, str]:
     """Get a summary of health check statuses."""
-    results = await asyncio.gather(
-        check_bot_connectivity(),
-        check_openrouter_api(),
-        check_cache_storage(),
-        check_database()
-    )
-
-    return {
-        "bot_connectivity": results[0]["status"],
-        "openrouter_api": results[1]["status"],
-        "cache_storage": results[2]["status"],
-        "database": results[3]["status"]
-    }
+    snapshot = await probe_snapshot()
+    return {name: result["status"] for name, result in snapshot["details"].items()}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # "auto" uses uvloop when installed (uvicorn[standard] skips it on Windows and PyPy)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="httptools", log_level="warning", access_log=False)
\ No newline at end of file
@@ -28,6 +28,14 @@ class Config:
     max_retries: int
     timeout: int
 
+    # Queue settings
+    concurrency: int
+    image_api_concurrency: int
+    ack_budget_ms: int
+    image_queue_max: int
+    user_max_inflight: int
+    openrouter_rpm: int
+
     # Storage settings
     retention_hours: float
     cache_dir: Path
@@ -35,6 +43,7 @@ class Config:
     # Image settings
     allowed_image_types: List[str]
     max_image_mb: float
+    max_image_dim: int
 
     def __init__(self):
         # Discord
@@ -50,6 +59,14 @@ class Config:
         self.max_retries = int(os.getenv('MAX_RETRIES', '3'))
         self.timeout = int(os.getenv('TIMEOUT', '60'))
 
+        # Queue
+        self.concurrency = max(1, int(os.getenv('CONCURRENCY', '2')))
+        self.image_api_concurrency = max(1, int(os.getenv('IMAGE_API_CONCURRENCY', '4')))
+        self.ack_budget_ms = max(100, int(os.getenv('ACK_BUDGET_MS', '2500')))
+        self.image_queue_max = max(1, int(os.getenv('IMAGE_QUEUE_MAX', '32')))
+        self.user_max_inflight = max(1, int(os.getenv('USER_MAX_INFLIGHT', '2')))
+        self.openrouter_rpm = max(0, int(os.getenv('OPENROUTER_RPM', '60')))
+
         # Storage
         self.retention_hours = float(os.getenv('RETENTION_HOURS', '1.0'))
         self.cache_dir = Path(os.getenv('CACHE_DIR', '.cache'))
@@ -57,6 +74,7 @@ class Config:
         # Images
         self.allowed_image_types = os.getenv('ALLOWED_IMAGE_TYPES', 'png,jpg,jpeg,webp').split(',')
         self.max_image_mb = float(os.getenv('MAX_IMAGE_MB', '10.0'))
+        self.max_image_dim = int(os.getenv('MAX_IMAGE_DIM', '1536'))
 
         # Strip whitespace from types
         self.allowed_image_types = [t.strip() for t in self.allowed_image_types]
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+import httpx
+
+from src.commands.utils.backpressure import BackpressureController, is_overload_error, SlidingWindowLimiter
+
+
+def _status_error(status_code):
+    response = Mock()
+    response.status_code = status_code
+    return httpx.HTTPStatusError("error", request=Mock(), response=response)
+
+
+class TestBackpressureController:
+
+    def test_is_overload_error(self):
+        """Test 429/5xx and timeouts count as overload, other errors do not."""
+        assert is_overload_error(_status_error(429))
+        assert is_overload_error(_status_error(503))
+        assert is_overload_error(httpx.ReadTimeout("timeout"))
+        assert not is_overload_error(_status_error(400))
+        assert not is_overload_error(ValueError("bad input"))
+
+    def test_multiplicative_decrease_on_rate_limit(self):
+        """Test a 429 halves the limit, but only once per cooldown window."""
+        controller = BackpressureController(initial=8)
+        controller.record(1.0, _status_error(429))
+        assert controller.limit == 4
+        controller.record(1.0, _status_error(429))
+        assert controller.limit == 4
+
+    def test_latency_breach_decreases(self):
+        """Test slow successful calls also reduce the limit."""
+        controller = BackpressureController(initial=8, latency_target=5.0)
+        controller.record(6.0)
+        assert controller.limit == 4
+
+    def test_additive_increase_is_bounded(self):
+        """Test healthy calls grow the limit up to c_max."""
+        controller = BackpressureController(initial=2, c_max=3)
+        for _ in range(100):
+            controller.record(0.1)
+        assert controller.limit == 3
+
+    @pytest.mark.asyncio
+    async def test_slot_tracks_in_flight(self):
+        """Test slot() holds and releases a concurrency slot."""
+        controller = BackpressureController(initial=2)
+        async with controller.slot():
+            assert controller.in_flight == 1
+        assert controller.in_flight == 0
+
+
+class TestSlidingWindowLimiter:
+
+    @pytest.mark.asyncio
+    async def test_requests_beyond_rpm_wait_for_the_window(self):
+        """Test the request after the per-window budget waits for the oldest to expire."""
+        limiter = SlidingWindowLimiter(rpm=2, window=0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(3):
+            await limiter.wait()
+        assert loop.time() - start >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_low_remaining_budget_pauses_callers(self):
+        """Test headers reporting a nearly spent budget pause until the reset."""
+        limiter = SlidingWindowLimiter(rpm=100)
+        limiter.observe(remaining=1, limit=100, reset_after=0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.wait()
+        assert loop.time() - start >= 0.09
+
+    def test_healthy_budget_does_not_pause(self):
+        """Test plenty of remaining requests leave the limiter unpaused."""
+        limiter = SlidingWindowLimiter(rpm=100)
+        limiter.observe(remaining=50, limit=100, reset_after=10)
+        assert limiter._paused_until == 0.0
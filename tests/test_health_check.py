@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src import health_check
+
+
+@pytest.fixture(autouse=True)
+def clear_check_cache():
+    health_check._check_results.clear()
+    health_check._check_locks.clear()
+    health_check._cache_storage_ok_until = 0.0
+    yield
+    health_check._check_results.clear()
+    health_check._check_locks.clear()
+
+
+@pytest.mark.asyncio
+async def test_cached_check_is_reused_within_ttl():
+    """Test concurrent and repeated requests inside the TTL make a single upstream check."""
+    check = AsyncMock(return_value={"status": "ok"})
+
+    results = await asyncio.gather(*(health_check._cached("openrouter_api", check) for _ in range(5)))
+    again = await health_check._cached("openrouter_api", check)
+
+    assert all(r == {"status": "ok"} for r in results)
+    assert again == {"status": "ok"}
+    check.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cached_check_refreshes_after_ttl():
+    """Test an expired result triggers a new check."""
+    check = AsyncMock(side_effect=[{"status": "ok"}, {"status": "degraded"}])
+
+    assert (await health_check._cached("openrouter_api", check, ttl=0))["status"] == "ok"
+    assert (await health_check._cached("openrouter_api", check, ttl=0))["status"] == "degraded"
+
+
+@pytest.mark.asyncio
+async def test_endpoints_share_one_probe_snapshot(monkeypatch):
+    """Test /healthz, /ready and /metrics reuse one probe run, and /ready rejects degraded."""
+    openrouter = AsyncMock(return_value={"status": "degraded", "message": "API returned 503"})
+    monkeypatch.setattr(health_check, "check_openrouter_api", openrouter)
+    monkeypatch.setattr(health_check, "check_cache_storage", AsyncMock(return_value={"status": "ok"}))
+
+    health = await health_check.healthz()
+    readiness = await health_check.ready()
+    summary = await health_check.get_health_status_summary()
+
+    assert health["status"] == "degraded"
+    assert readiness.status_code == 503
+    assert summary["openrouter_api"] == "degraded"
+    openrouter.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cache_storage_success_is_trusted_for_a_while(tmp_path, monkeypatch):
+    """Test a passing write probe is not repeated until CACHE_STORAGE_OK_TTL elapses."""
+    get_cache_dir = Mock(return_value=tmp_path)
+    monkeypatch.setattr(health_check, "get_cache_dir", get_cache_dir)
+
+    assert (await health_check.check_cache_storage())["status"] == "ok"
+    assert (await health_check.check_cache_storage())["status"] == "ok"
+    assert get_cache_dir.call_count == 1
+
+    health_check._cache_storage_ok_until = 0.0
+    await health_check.check_cache_storage()
+    assert get_cache_dir.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_hung_probe_is_reported_degraded(monkeypatch):
+    """Test a probe exceeding PROBE_TIMEOUT degrades only itself and does not stall the snapshot."""
+    async def hang():
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(health_check, "PROBE_TIMEOUT", 0.05)
+    monkeypatch.setattr(health_check, "check_openrouter_api", hang)
+    monkeypatch.setattr(health_check, "check_cache_storage", AsyncMock(side_effect=OSError("read-only")))
+
+    snapshot = await health_check.probe_snapshot()
+
+    assert snapshot["details"]["openrouter_api"] == {"status": "degraded", "message": "probe timeout"}
+    assert snapshot["details"]["cache_storage"]["status"] == "unhealthy"
+    assert snapshot["details"]["database"]["status"] == "ok"
+
+
+def test_ready_returns_503_unless_every_check_is_ok(monkeypatch):
+    """Test /ready answers 503 for a degraded snapshot and 200 once all checks pass."""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(health_check, "check_cache_storage", AsyncMock(return_value={"status": "ok"}))
+    monkeypatch.setattr(health_check, "check_openrouter_api", AsyncMock(return_value={"status": "degraded"}))
+    client = TestClient(health_check.app)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unhealthy"
+
+    health_check._check_results.clear()
+    monkeypatch.setattr(health_check, "check_openrouter_api", AsyncMock(return_value={"status": "ok"}))
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
@@ -0,0 +1,54 @@
+from io import BytesIO
+from unittest.mock import AsyncMock, Mock
+
+import discord
+import pytest
+
+from src.commands.utils.images import ValidatedImage, fetch_and_validate_attachments_async, prepare_image_for_api
+
+
+def make_attachment(filename, data, content_type="image/png"):
+    attachment = Mock(spec=discord.Attachment)
+    attachment.filename = filename
+    attachment.content_type = content_type
+    attachment.size = len(data)
+    attachment.read = AsyncMock(return_value=data)
+    return attachment
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_validate_attachments_async_keeps_order_and_skips_invalid():
+    """Test valid attachments are returned in memory, in input order, without invalid ones."""
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new('RGB', (10, 10), color='blue').save(buffer, format='PNG')
+    first = make_attachment("first.png", buffer.getvalue())
+    corrupt = make_attachment("corrupt.png", b"not an image")
+    second = make_attachment("second.png", buffer.getvalue())
+
+    images = await fetch_and_validate_attachments_async([first, corrupt, second])
+
+    assert [image.filename for image in images] == ["first.png", "second.png"]
+    assert images[0].data == buffer.getvalue()
+
+
+def test_prepare_image_for_api_from_memory():
+    """Test in-memory images become a data URL with their sniffed MIME type."""
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new('RGB', (10, 10), color='green').save(buffer, format='JPEG')
+
+    prepared = prepare_image_for_api(ValidatedImage.from_bytes(buffer.getvalue()))
+
+    assert prepared.url.startswith("data:image/jpeg;base64,")
+
+
+def test_http_session_is_reused_per_thread_only():
+    """Test each executor thread keeps its own pooled requests.Session."""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.commands.utils import images
+
+    assert images._http_session() is images._http_session()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        other = pool.submit(images._http_session).result()
+    assert other is not images._http_session()
@@ -11,7 +11,9 @@ from src.commands.utils.openrouter import (
     ImageInput,
     ContentItem,
     ContentItem,
-    ChatRequest
+    ChatRequest,
+    _maybe_downscale,
+    _search_base64_leaves,
 )
 
 
@@ -46,17 +48,24 @@ class TestOpenRouterClient:
             await mock_openrouter_client._encode_image_to_base64(fake_path)
 
     @pytest.mark.asyncio
-    async def test_download_image_to_temp(self, mock_openrouter_client):
-        """Test downloading image to temp file."""
-        mock_response = Mock()
-        mock_response.content = b"fake image data"
-        mock_openrouter_client.session.get = AsyncMock(return_value=mock_response)
+    async def test_process_image_input_attachment_in_memory(self, mock_openrouter_client, mock_discord_attachment):
+        """Test attachments are encoded from memory without a temp file."""
+        result = await mock_openrouter_client._process_image_input(mock_discord_attachment)
+
+        mock_discord_attachment.read.assert_awaited_once()
+        assert result.image_url.startswith("data:image/png;base64,")
+        expected = base64.b64encode(await mock_discord_attachment.read()).decode()
+        assert result.image_url.split(",", 1)[1] == expected
+
+    @pytest.mark.asyncio
+    async def test_encode_image_to_base64_streams_large_files(self, mock_openrouter_client, tmp_path):
+        """Test chunked encoding matches a one-shot encode across chunk boundaries."""
+        payload = os.urandom(500_000)
+        image_file = tmp_path / "large.png"
+        image_file.write_bytes(payload)
 
-        temp_path = await mock_openrouter_client._download_image_to_temp("https://example.com/img.png")
-        assert temp_path.exists()
-        assert temp_path.read_bytes() == b"fake image data"
-        # Cleanup temp file
-        temp_path.unlink()
+        data_url = await mock_openrouter_client._encode_image_to_base64(image_file)
+        assert data_url == "data:image/png;base64," + base64.b64encode(payload).decode()
 
     @pytest.mark.asyncio
     async def test_process_image_input_url(self, mock_openrouter_client):
@@ -79,6 +88,31 @@ class TestOpenRouterClient:
         assert result.type == "image_url"
         assert result.image_url.startswith("data:image/png;base64,")
 
+    @pytest.mark.asyncio
+    async def test_process_image_inputs_fetches_repeated_attachment_once(self, mock_openrouter_client, mock_discord_attachment):
+        """Test an attachment passed twice in one request is downloaded and encoded once."""
+        items = await mock_openrouter_client._process_image_inputs([mock_discord_attachment, mock_discord_attachment])
+
+        mock_discord_attachment.read.assert_awaited_once()
+        assert items[0] is items[1]
+
+    @pytest.mark.asyncio
+    async def test_process_image_input_dedupes_identical_files(self, mock_openrouter_client, tmp_path):
+        """Test identical local images are only encoded once per client."""
+        from PIL import Image
+        first = tmp_path / "a.png"
+        second = tmp_path / "b.png"
+        Image.new('RGB', (10, 10), color='red').save(first, format='PNG')
+        second.write_bytes(first.read_bytes())
+
+        first_item = await mock_openrouter_client._process_image_input(first)
+        with patch.object(mock_openrouter_client, "_encode_image_to_base64", new=AsyncMock()) as encode:
+            second_item = await mock_openrouter_client._process_image_input(str(second))
+            encode.assert_not_awaited()
+
+        assert first_item is second_item
+        assert first_item.image_url == "data:image/png;base64," + base64.b64encode(first.read_bytes()).decode()
+
     def test_chat_request_model(self, golden_payloads):
         """Test ChatRequest model serialization."""
         content = [ContentItem(type="text", text="test")]
@@ -236,12 +270,86 @@ class TestOpenRouterClient:
             sleep_call = mock_sleep.call_args[0][0]
             assert sleep_call >= 1  # First retry: 2^0 = 1 second
 
+    @pytest.mark.asyncio
+    async def test_shared_client_is_reused_until_closed(self):
+        """Test shared() hands out one client and close() releases it."""
+        first = OpenRouterClient.shared()
+        assert OpenRouterClient.shared() is first
+
+        await first.close()
+        second = OpenRouterClient.shared()
+        assert second is not first
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_make_request_with_retry_honours_retry_after(self, mock_openrouter_client):
+        """Test a 429 with Retry-After waits that long, then surfaces OpenRouterAPIError."""
+        import httpx
+        from src.commands.utils.openrouter import OpenRouterAPIError
+        request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+        rate_limited = httpx.Response(429, headers={"Retry-After": "7"}, request=request)
+        mock_openrouter_client.session.post = AsyncMock(return_value=rate_limited)
+        # asyncio.sleep is patched below; RPM pacing is covered by the limiter's own tests
+        mock_openrouter_client.rate_limiter = None
+
+        with patch("src.commands.utils.openrouter.asyncio.sleep", AsyncMock()) as mock_sleep, \
+             patch("src.commands.utils.openrouter.config.max_retries", 1):
+            with pytest.raises(OpenRouterAPIError) as exc_info:
+                await mock_openrouter_client._make_request_with_retry({"test": "data"})
+
+        mock_sleep.assert_awaited_once_with(7.0)
+        assert exc_info.value.is_rate_limited
+        assert exc_info.value.retry_after == 7.0
+
+    def test_image_cache_is_bounded_by_size(self, mock_openrouter_client):
+        """Test encoded inputs are evicted oldest first once their total size passes the limit."""
+        from src.commands.utils.openrouter import ContentItem
+
+        with patch("src.commands.utils.openrouter._IMAGE_CACHE_MAX_BYTES", 25):
+            for key in ("a", "b", "c"):
+                mock_openrouter_client._cache_image(key, ContentItem(type="image_url", image_url=key * 10))
+            mock_openrouter_client._cache_image("huge", ContentItem(type="image_url", image_url="x" * 30))
+
+        assert list(mock_openrouter_client._image_cache) == ["b", "c"]
+        assert mock_openrouter_client._image_cache_bytes == 20
+
     @pytest.mark.asyncio
     async def test_close_session(self, mock_openrouter_client):
         """Test session cleanup."""
         await mock_openrouter_client.close()
         mock_openrouter_client.session.aclose.assert_called_once()
 
+    def test_maybe_downscale_large_image(self):
+        """Test oversized images are shrunk and re-encoded as JPEG."""
+        from io import BytesIO
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', (4000, 2000), color='blue').save(buffer, format='PNG')
+
+        with patch("src.commands.utils.openrouter.config.max_image_dim", 1000):
+            data, mime = _maybe_downscale(buffer.getvalue(), "image/png")
+
+        assert mime == "image/jpeg"
+        assert Image.open(BytesIO(data)).size == (1000, 500)
+
+    def test_maybe_downscale_small_image_untouched(self):
+        """Test images within the limit are passed through unchanged."""
+        from io import BytesIO
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10), color='red').save(buffer, format='PNG')
+        original = buffer.getvalue()
+
+        assert _maybe_downscale(original, "image/png") == (original, "image/png")
+
+    def test_search_base64_leaves_finds_embedded_png(self):
+        """Test the regex fallback finds base64 embedded inside a nested string leaf."""
+        png_b64 = "iVBORw0KGgo" + "A" * 2000
+        response = {"choices": [{"message": {"content": [{"note": f"here: {png_b64} done"}]}}]}
+
+        assert _search_base64_leaves(response) == png_b64
+        assert _search_base64_leaves({"choices": [{"message": {"content": "short"}}]}) is None
+
     # Golden payload tests using golden_payloads fixture
     def test_generate_payload_matches_golden_basic(self, golden_payloads):
         """Test generate payload structure against golden data."""
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.commands.utils.progress import ProgressReporter
+
+STAGES = (("⏳", "Queued"), ("🔄", "Processing"), ("🎨", "Generating"), ("🔧", "Finalizing"))
+
+
+def make_interaction():
+    message = Mock()
+    message.edit = AsyncMock()
+    interaction = Mock()
+    interaction.followup.send = AsyncMock(return_value=message)
+    return interaction, message
+
+
+@pytest.mark.asyncio
+async def test_rapid_stage_changes_collapse_into_one_edit():
+    """Test stages advanced within the edit interval produce a single edit of the latest one."""
+    interaction, message = make_interaction()
+    reporter = ProgressReporter(interaction, "Title", STAGES, "a cat", min_interval=0.05)
+
+    await reporter.start()
+    await reporter.advance(2)
+    await reporter.advance(3)
+    await asyncio.sleep(0.15)
+    await reporter.close()
+
+    message.edit.assert_awaited_once()
+    description = message.edit.await_args.kwargs["embed"].description
+    assert "✅ Generating → 🔧 Finalizing" in description
+
+
+@pytest.mark.asyncio
+async def test_complete_drops_pending_update():
+    """Test completion supersedes a pending stage edit and marks every stage done."""
+    interaction, message = make_interaction()
+    reporter = ProgressReporter(interaction, "Title", STAGES, "a cat", min_interval=10)
+
+    await reporter.start()
+    await reporter.advance(2)
+    await reporter.complete("**Complete!**", prompt="a cat")
+
+    message.edit.assert_awaited_once()
+    embed = message.edit.await_args.kwargs["embed"]
+    assert embed.description.startswith("✅ Queued → ✅ Processing → ✅ Generating → ✅ Finalizing")
+    assert embed.description.endswith("**Prompt:** a cat")
+
+
+@pytest.mark.asyncio
+async def test_complete_attaches_files_in_the_same_edit():
+    """Test result files go out with the completion edit, rewound to the start."""
+    import io
+    import discord
+
+    interaction, message = make_interaction()
+    reporter = ProgressReporter(interaction, "Title", STAGES, "a cat")
+    file = discord.File(io.BytesIO(b"png-bytes"), filename="generated.png")
+    file.fp.read()
+
+    await reporter.start()
+    await reporter.complete("**Complete!**", files=[file])
+
+    assert message.edit.await_args.kwargs["attachments"] == [file]
+    assert file.fp.read() == b"png-bytes"
+    interaction.followup.send.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_complete_without_message_is_a_noop():
+    """Test completing a reporter whose message was never sent does not raise."""
+    interaction, message = make_interaction()
+    reporter = ProgressReporter(interaction, "Title", STAGES, "a cat")
+
+    await reporter.complete("**Complete!**")
+
+    message.edit.assert_not_awaited()
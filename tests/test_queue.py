@@ -0,0 +1,361 @@
+import pytest
+import pytest_asyncio
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from src.commands.utils.openrouter import GeneratedImage
+from src.commands.utils.queue import AsyncImageQueue
+
+
+@pytest_asyncio.fixture
+async def image_queue():
+    """AsyncImageQueue with a mocked client; workers are cancelled on teardown."""
+    client = Mock()
+    client.generate_image = AsyncMock()
+    client.model = "test-model"
+    queue = AsyncImageQueue(client=client, num_workers=1)
+    yield queue
+    for task in queue.tasks:
+        task.cancel()
+    await asyncio.gather(*queue.tasks, return_exceptions=True)
+
+
+class TestAsyncImageQueue:
+
+    @pytest.mark.asyncio
+    async def test_identical_seeded_requests_share_one_call(self, image_queue):
+        """Test concurrent identical seeded imagine requests make a single API call."""
+        release = asyncio.Event()
+        images = [GeneratedImage(base64="abc", seed=7)]
+
+        async def slow_generate(**kwargs):
+            await release.wait()
+            return images
+        image_queue.client.generate_image.side_effect = slow_generate
+
+        first = asyncio.create_task(image_queue._generate_coalesced("cat", None, 1, 7, "png"))
+        second = asyncio.create_task(image_queue._generate_coalesced("cat", None, 1, 7, "png"))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await first == images
+        assert await second == images
+        assert image_queue.client.generate_image.await_count == 1
+        assert not image_queue.inflight
+
+    @pytest.mark.asyncio
+    async def test_unseeded_requests_are_not_coalesced(self, image_queue):
+        """Test requests without a seed always generate independently."""
+        image_queue.client.generate_image.return_value = []
+
+        await asyncio.gather(
+            image_queue._generate_coalesced("cat", None, 1, None, "png"),
+            image_queue._generate_coalesced("cat", None, 1, None, "png"),
+        )
+        assert image_queue.client.generate_image.await_count == 2
+
+
+class TestRenderImageFile:
+
+    def test_rendered_bytes_are_reused(self, sample_generated_image):
+        """Test a repeated image is decoded once and each call gets a fresh file."""
+        from unittest.mock import patch
+        from src.commands.utils import queue as queue_module
+
+        queue_module._rendered_cache.clear()
+        queue_module._rendered_cache_bytes = 0
+        with patch.object(queue_module, "iter_image_sources", wraps=queue_module.iter_image_sources) as mock_process:
+            first = queue_module._render_image_file(sample_generated_image, 0, "generated", 1, "png")
+            second = queue_module._render_image_file(sample_generated_image, 0, "generated", 1, "png")
+
+        assert mock_process.call_count == 1
+        assert first.fp is not second.fp
+        assert first.fp.read() == second.fp.read()
+        assert second.filename == "generated.png"
+
+
+@pytest.mark.asyncio
+async def test_multi_image_generation_fans_out_with_distinct_seeds(image_queue):
+    """Test count>1 issues one single-image call per image with consecutive seeds."""
+    async def fake_generate(prompt, style, count, seed, format):
+        return [GeneratedImage(url=f"https://example.com/{seed}.png", prompt=prompt, seed=seed)]
+
+    image_queue.client.generate_image.side_effect = fake_generate
+
+    images = await image_queue._generate_parallel("a cat", None, 3, 10, "png")
+
+    assert image_queue.client.generate_image.await_count == 3
+    assert all(call.kwargs["count"] == 1 for call in image_queue.client.generate_image.await_args_list)
+    assert sorted(img.seed for img in images) == [10, 11, 12]
+
+
+@pytest.mark.asyncio
+async def test_multi_image_generation_keeps_partial_results(image_queue):
+    """Test a failed call among several still returns the images that succeeded."""
+    calls = 0
+
+    async def flaky_generate(prompt, style, count, seed, format):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("boom")
+        return [GeneratedImage(url="https://example.com/img.png", prompt=prompt, seed=seed)]
+
+    image_queue.client.generate_image.side_effect = flaky_generate
+
+    images = await image_queue._generate_parallel("a cat", None, 4, None, "png")
+
+    assert len(images) == 3
+
+
+@pytest.mark.asyncio
+async def test_defer_past_ack_budget_reports_expired(monkeypatch):
+    """Test a defer that exceeds the ACK budget is abandoned instead of awaited."""
+    from src.commands.utils import queue as queue_module
+
+    async def slow_defer():
+        await asyncio.sleep(1)
+
+    interaction = Mock()
+    interaction.response.defer = slow_defer
+    monkeypatch.setattr(queue_module.config, "ack_budget_ms", 10)
+
+    assert await queue_module._defer_within_budget(interaction) is False
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_busy_message():
+    """Test enqueueing past maxsize tells the user to retry instead of waiting."""
+    client = Mock()
+    queue = AsyncImageQueue(client=client, num_workers=1, maxsize=1)
+    for task in queue.tasks:
+        task.cancel()
+    await asyncio.gather(*queue.tasks, return_exceptions=True)
+
+    interaction = Mock()
+    interaction.followup.send = AsyncMock()
+
+    assert await queue.enqueue_imagine(interaction, "a cat") is True
+    assert await queue.enqueue_imagine(interaction, "a dog") is False
+    assert queue.current_occupancy() == 1
+    interaction.followup.send.assert_awaited_once()
+    assert interaction.followup.send.await_args.kwargs["ephemeral"] is True
+
+
+@pytest.mark.asyncio
+async def test_aclose_drains_then_stops_workers():
+    """Test shutdown waits for queued jobs, stops workers, rejects new work and leaves the client open."""
+    client = Mock()
+    client.close = AsyncMock()
+    queue = AsyncImageQueue(client=client, num_workers=2)
+    queue.process_imagine = AsyncMock()
+
+    interaction = Mock()
+    interaction.followup.send = AsyncMock()
+    await queue.enqueue_imagine(interaction, "a cat")
+
+    await queue.aclose(drain_timeout=1)
+
+    queue.process_imagine.assert_awaited_once()
+    assert all(task.done() for task in queue.tasks)
+    client.close.assert_not_awaited()
+    assert await queue.enqueue_imagine(interaction, "a dog") is False
+
+
+@pytest.mark.asyncio
+async def test_materialize_source_decodes_generated_images(image_queue, sample_generated_image, tmp_path):
+    """Test generated images decode in memory and existing local paths pass through."""
+    from src.commands.utils.images import ValidatedImage
+
+    local = tmp_path / "source.png"
+    local.write_bytes(b"data")
+
+    decoded = await image_queue._materialize_source(sample_generated_image)
+    passthrough = await image_queue._materialize_source(str(local))
+
+    assert isinstance(decoded, ValidatedImage)
+    assert decoded.content_type == "image/png"
+    assert passthrough == str(local)
+    with pytest.raises(FileNotFoundError):
+        await image_queue._materialize_source(str(tmp_path / "missing.png"))
+
+
+@pytest.mark.asyncio
+async def test_workers_run_queued_jobs_concurrently():
+    """Test queued jobs are spread across the worker pool rather than run one after another."""
+    client = Mock()
+    client.close = AsyncMock()
+    queue = AsyncImageQueue(client=client, num_workers=3)
+    running = 0
+    peak = 0
+
+    async def fake_process(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    queue.process_imagine = fake_process
+    for prompt in ("a", "b", "c"):
+        # One interaction (and so one user) per job, staying under the per-user cap
+        interaction = Mock()
+        interaction.followup.send = AsyncMock()
+        await queue.enqueue_imagine(interaction, prompt)
+
+    await queue.aclose(drain_timeout=1)
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_seeded_results_are_served_from_cache(image_queue, sample_generated_image, tmp_path, monkeypatch):
+    """Test a repeated seeded request skips the API, including after the memory LRU is cleared."""
+    from src.commands.utils import storage
+
+    monkeypatch.chdir(tmp_path)
+    # Resolve the cache directory under tmp_path; the previous one is restored afterwards
+    monkeypatch.setattr(storage, "_cache_dir", None)
+    image_queue.client.generate_image.return_value = [sample_generated_image]
+
+    first = await image_queue._generate_cached("a cat", None, 1, 42, "webp")
+    from src.commands.utils.queue import _background_tasks
+    await asyncio.gather(*_background_tasks)
+    image_queue._results.clear()
+    second = await image_queue._generate_cached("a cat", None, 1, 42, "webp")
+
+    assert [p.suffix for p in storage.get_cache_dir().glob("imagine_*")] == [".webp"]
+    assert image_queue.client.generate_image.await_count == 1
+    assert second[0].base64 == first[0].base64
+    assert second[0].seed == 42
+
+
+@pytest.mark.asyncio
+async def test_partial_persisted_results_are_a_miss(image_queue, sample_generated_image, tmp_path, monkeypatch):
+    """Test partial result sets are neither persisted, loaded from disk nor kept in memory."""
+    from src.commands.utils import storage
+    from src.commands.utils.queue import _load_cached_results, _persist_results, _result_filename
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, "_cache_dir", None)
+    url_only = GeneratedImage(url="https://example.com/img.png", seed=1)
+
+    _persist_results("mixed", [sample_generated_image, url_only], "png")
+    assert list(storage.get_cache_dir().glob("imagine_mixed_*")) == []
+    assert _load_cached_results("mixed", 2, "png") == []
+
+    _persist_results("full", [sample_generated_image, sample_generated_image], "png")
+    assert len(_load_cached_results("full", 2, "png")) == 2
+    (storage.get_cache_dir() / _result_filename("full", 1, "png")).unlink()
+    assert _load_cached_results("full", 2, "png") == []
+
+    calls = 0
+
+    async def flaky_generate(prompt, style, count, seed, format):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("boom")
+        return [GeneratedImage(base64="abc", prompt=prompt, seed=seed)]
+
+    image_queue.client.generate_image.side_effect = flaky_generate
+
+    first = await image_queue._generate_cached("a cat", None, 3, 5, "png")
+    assert len(first) == 2
+    await image_queue._generate_cached("a cat", None, 3, 5, "png")
+    assert calls == 6
+
+
+@pytest.mark.asyncio
+async def test_progress_reports_validation_errors_and_closes_reporter(image_queue, monkeypatch):
+    """Test a ValidationError raised inside a job is reported and the progress coalescer is stopped."""
+    from src.commands.utils import queue as queue_module
+    from src.commands.utils.validators import ValidationError
+
+    handle_error = AsyncMock()
+    monkeypatch.setattr(queue_module, "handle_error", handle_error)
+    interaction = Mock()
+    interaction.followup.send = AsyncMock()
+
+    async with image_queue._progress(interaction, "Title", queue_module._IMAGINE_STAGES, "cat", "process_imagine") as reporter:
+        raise ValidationError("bad input")
+
+    handle_error.assert_awaited_once()
+    assert handle_error.await_args.args[1] == "bad input"
+    assert reporter._flusher is None
+
+
+@pytest.mark.asyncio
+async def test_repeated_base64_sources_are_decoded_once(image_queue, sample_generated_image, monkeypatch):
+    """Test editing the same generated image again reuses the decoded bytes."""
+    from src.commands.utils import queue as queue_module
+
+    decode = Mock(wraps=queue_module._decode_b64_image)
+    monkeypatch.setattr(queue_module, "_decode_b64_image", decode)
+
+    first = await image_queue._materialize_source(sample_generated_image)
+    second = await image_queue._materialize_source(sample_generated_image)
+
+    assert first is second
+    decode.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_render_files_keeps_order_and_drops_failures(sample_generated_image):
+    """Test threaded rendering returns files in input order without failed images."""
+    from src.commands.utils import queue as queue_module
+
+    broken = GeneratedImage(base64="not-an-image", seed=1)
+    files = await queue_module.render_files([sample_generated_image, broken, sample_generated_image], "generated", 3, "png")
+
+    assert [f.filename for f in files] == ["generated_1.png", "generated_3.png"]
+
+
+@pytest.mark.asyncio
+async def test_deliveries_finish_before_shutdown_and_report_failures(monkeypatch):
+    """Test queued uploads are completed during aclose and a failed upload is reported."""
+    from src.commands.utils import queue as queue_module
+
+    handle_error = AsyncMock()
+    monkeypatch.setattr(queue_module, "handle_error", handle_error)
+    client = Mock()
+    client.close = AsyncMock()
+    queue = AsyncImageQueue(client=client, num_workers=1)
+
+    delivered = Mock()
+    delivered.complete = AsyncMock()
+    failed = Mock()
+    failed.complete = AsyncMock(side_effect=RuntimeError("upload failed"))
+    await queue._deliver(delivered, "done", files=[])
+    await queue._deliver(failed, "done")
+
+    await queue.aclose(drain_timeout=1)
+
+    delivered.complete.assert_awaited_once_with("done", files=[])
+    handle_error.assert_awaited_once()
+    assert handle_error.await_args.args[0] is failed.interaction
+
+
+@pytest.mark.asyncio
+async def test_per_user_inflight_cap(monkeypatch):
+    """Test a user past USER_MAX_INFLIGHT is rejected until one of their jobs finishes."""
+    from src.commands.utils import queue as queue_module
+
+    monkeypatch.setattr(queue_module.config, "user_max_inflight", 1)
+    queue = AsyncImageQueue(client=Mock(), num_workers=1)
+    for task in queue.tasks:
+        task.cancel()
+    await asyncio.gather(*queue.tasks, return_exceptions=True)
+    queue.process_imagine = AsyncMock()
+
+    interaction = Mock()
+    interaction.followup.send = AsyncMock()
+    other = Mock()
+    other.followup.send = AsyncMock()
+
+    assert await queue.enqueue_imagine(interaction, "a cat") is True
+    assert await queue.enqueue_imagine(interaction, "a dog") is False
+    assert await queue.enqueue_imagine(other, "a bird") is True
+
+    await queue._run_item(queue.queue.get_nowait())
+    assert await queue.enqueue_imagine(interaction, "a dog") is True
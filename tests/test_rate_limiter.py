@@ -0,0 +1,106 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from src.commands.utils.rate_limiter import RateLimiter, RateLimitExceeded, rate_limited
+
+
+class TestRateLimiter:
+
+    def test_burst_up_to_limit_then_refill(self):
+        """Test a user can burst to the limit and regains one request per window/limit seconds."""
+        limiter = RateLimiter(default_limit=3, default_window=60)
+        assert all(limiter.check_rate_limit("u", "imagine", current_time=0) for _ in range(3))
+        assert not limiter.check_rate_limit("u", "imagine", current_time=0)
+        assert limiter.get_remaining_requests("u", "imagine", current_time=0) == 0
+        assert limiter.get_reset_time("u", "imagine", current_time=0) == 20
+
+        assert limiter.check_rate_limit("u", "imagine", current_time=20)
+        assert not limiter.check_rate_limit("u", "imagine", current_time=20)
+        assert limiter.get_remaining_requests("u", "imagine", current_time=1000) == 3
+
+    def test_limits_are_per_user_and_command(self):
+        """Test buckets are independent and command overrides apply."""
+        limiter = RateLimiter(default_limit=5, default_window=60)
+        limiter.set_command_limit("blend", 1, 300)
+        assert limiter.check_rate_limit("u", "blend", current_time=0)
+        assert not limiter.check_rate_limit("u", "blend", current_time=0)
+        assert limiter.check_rate_limit("v", "blend", current_time=0)
+        assert limiter.check_rate_limit("u", "imagine", current_time=0)
+
+    @pytest.mark.asyncio
+    async def test_cleanup_drops_inactive_users(self):
+        """Test users idle past the threshold are removed and active ones kept."""
+        limiter = RateLimiter()
+        now = time.monotonic()
+        limiter.check_rate_limit("old", "imagine", current_time=now - 48 * 3600)
+        limiter.check_rate_limit("new", "imagine", current_time=now)
+        limiter.check_rate_limit("returning", "imagine", current_time=now - 48 * 3600)
+        limiter.check_rate_limit("returning", "imagine", current_time=now)
+        await limiter.cleanup_inactive_users(threshold_hours=24, yield_every=2)
+        assert "old" not in limiter._cache
+        assert "new" in limiter._cache
+        assert "returning" in limiter._cache
+        assert len(limiter._expiry_heap) == 2
+
+    def test_command_limit_change_takes_effect(self):
+        """Test changing a command limit after it was used invalidates the cached lookup."""
+        limiter = RateLimiter(default_limit=1, default_window=60)
+        assert limiter.check_rate_limit("u", "imagine", current_time=0)
+        assert not limiter.check_rate_limit("u", "imagine", current_time=0)
+        limiter.set_command_limit("imagine", 5, 60)
+        assert limiter.get_remaining_requests("v", "imagine", current_time=0) == 5
+
+
+class TestRateLimitedDecorator:
+
+    @pytest.mark.asyncio
+    async def test_slash_command_uses_interaction_user(self):
+        """Test the async wrapper limits by the interaction's user and raises once exhausted."""
+        limiter = RateLimiter(default_limit=1, default_window=60)
+
+        @rate_limited(limiter)
+        async def command(interaction, prompt):
+            return prompt
+
+        interaction = Mock()
+        interaction.user.id = 42
+        assert await command(interaction, "cat") == "cat"
+        with pytest.raises(RateLimitExceeded):
+            await command(interaction, "cat")
+        assert limiter.get_remaining_requests(42, "command") == 0
+
+    def test_sync_function_with_user_id_parameter(self):
+        """Test a user_id parameter is read positionally or by keyword."""
+        limiter = RateLimiter(default_limit=1, default_window=60)
+
+        @rate_limited(limiter)
+        def command(user_id, value):
+            return value
+
+        assert command("u", 1) == 1
+        with pytest.raises(RateLimitExceeded):
+            command(user_id="u", value=2)
+
+    @pytest.mark.asyncio
+    async def test_message_author_and_sync_ids_share_one_bucket(self):
+        """Test message commands key by author id and every path normalises ids to int."""
+        limiter = RateLimiter(default_limit=2, default_window=60)
+
+        @rate_limited(limiter, command_name="cmd")
+        async def on_message(cog, message):
+            return message
+
+        @rate_limited(limiter, command_name="cmd")
+        def sync_command(uid):
+            return uid
+
+        cog = object()
+        message = Mock()
+        message.author.id = 42
+        assert await on_message(cog, message) is message
+        assert sync_command("42") == "42"
+        with pytest.raises(RateLimitExceeded):
+            sync_command(42)
+        assert limiter.get_remaining_requests(42, "cmd") == 0
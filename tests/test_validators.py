@@ -0,0 +1,134 @@
+import discord
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.commands.utils.validators import (
+    PromptView,
+    ValidationError,
+    find_term,
+    is_balanced,
+    validate_attachments,
+    validate_command_count,
+    validate_prompt,
+    validate_prompt_content,
+)
+
+
+class TestProhibitedTerms:
+
+    def test_find_term_matches_substrings(self):
+        """Test terms are found anywhere in the text, preferring the longest at a position."""
+        assert find_term("a bombastic sky", ["bomb"]) == "bomb"
+        assert find_term("an asshole", ["ass", "asshole"]) == "asshole"
+        assert find_term("a calm lake", ["bomb", "gun"]) is None
+
+    def test_find_term_follows_list_changes(self):
+        """Test edits to a term list are seen by the next scan."""
+        terms = ["storm"]
+        assert find_term("thunder", terms) is None
+        terms.append("thunder")
+        assert find_term("thunder", terms) == "thunder"
+
+    def test_set_prohibited_terms_replaces_the_terms(self, monkeypatch):
+        """Test set_prohibited_terms swaps the terms find_prohibited_term scans for."""
+        from src.commands.utils import validators
+
+        monkeypatch.setattr(validators, "PROHIBITED_TERMS", validators.PROHIBITED_TERMS)
+        monkeypatch.setattr(validators, "_prohibited_index", validators._prohibited_index)
+        validators.set_prohibited_terms(["Storm", "thunder"])
+        assert validators.PROHIBITED_TERMS == ("Storm", "thunder")
+        assert validators.find_prohibited_term("a storm") == "storm"
+        assert validators.find_prohibited_term("a gun") is None
+        validators.set_prohibited_terms(["hail"])
+        assert validators.find_prohibited_term("thunder") is None
+        assert validators.find_prohibited_term("hail") == "hail"
+
+    def test_validate_prompt_content_reports_term(self):
+        """Test prohibited content is rejected case-insensitively with the term named."""
+        with pytest.raises(ValidationError, match="'gun'"):
+            validate_prompt_content("A GUN on a table")
+        validate_prompt_content("a quiet meadow")
+
+    def test_terms_are_matched_case_insensitively(self):
+        """Test mixed-case terms added by admins still match lowercased prompts."""
+        assert find_term("a thunder storm", ["Thunder"]) == "thunder"
+
+    def test_prompt_view_is_shared_between_validators(self):
+        """Test one PromptView serves both validators and lowercases the prompt once."""
+        view = PromptView.of("  A Calm Lake  ")
+        validate_prompt(None, view)
+        validate_prompt_content(view)
+        assert view.stripped == "A Calm Lake"
+        assert view.lower is view.lower == "a calm lake"
+        assert PromptView.of(view) is view
+
+    def test_oversized_prompt_is_rejected_before_lowercasing(self):
+        """Test the length check fails fast without building the lowercase copy."""
+        view = PromptView.of("x" * 600)
+        with pytest.raises(ValidationError, match="no more than 500"):
+            validate_prompt_content(view)
+        assert view._lower is None
+
+
+def _attachment(content_type, size):
+    attachment = Mock(spec=discord.Attachment)
+    attachment.content_type = content_type
+    attachment.size = size
+    return attachment
+
+
+class TestValidateAttachments:
+
+    def test_valid_attachments_pass(self):
+        """Test allowed types within the size limit pass, including a missing content type."""
+        validate_attachments(None, [_attachment("IMAGE/PNG", 100), _attachment(None, 100)])
+
+    def test_first_failing_attachment_is_reported(self):
+        """Test the earliest failing attachment is reported, whichever check it fails."""
+        oversized = _attachment("image/png", 20 * 1024 * 1024)
+        wrong_type = _attachment("application/pdf", 100)
+
+        with pytest.raises(ValidationError, match="Attachment 1: File too large"):
+            validate_attachments(None, [oversized, wrong_type])
+        with pytest.raises(ValidationError, match="Attachment 1: Invalid file type 'application/pdf'"):
+            validate_attachments(None, [wrong_type, oversized])
+
+
+class TestIsBalanced:
+
+    def test_single_bracket_type(self):
+        """Test the depth-counter path for prompts with one kind of bracket."""
+        assert is_balanced("a cat (fluffy (orange))")
+        assert not is_balanced("a cat (fluffy")
+        assert not is_balanced("a cat) (")
+        assert is_balanced("no brackets at all")
+
+    def test_mixed_bracket_types(self):
+        """Test nesting across bracket types goes through the stack."""
+        assert is_balanced("a [cat (fluffy)] {x}")
+        assert not is_balanced("a [cat (fluffy]) ")
+        assert not is_balanced("a [b{")
+
+    def test_quotes_are_checked_by_parity(self):
+        """Test paired quotes pass, stray ones fail, and apostrophes are allowed."""
+        assert is_balanced('a "cute" cat (with `code`)')
+        assert not is_balanced('a "cute cat')
+        assert is_balanced("the cat's hat, don't move")
+
+
+class TestCommandDecorators:
+
+    @pytest.mark.asyncio
+    async def test_count_is_read_from_named_kwarg(self):
+        """Test the decorator validates kwargs[param_name] and blocks the command on failure."""
+        command = AsyncMock()
+        decorated = validate_command_count(max_count=4, param_name="n")(command)
+        interaction = Mock()
+
+        with patch("src.commands.utils.validators.handle_error", new=AsyncMock()) as handle_error:
+            await decorated(interaction, "prompt", n=9)
+            handle_error.assert_awaited_once()
+            command.assert_not_awaited()
+
+            await decorated(interaction, "prompt", n=2)
+            command.assert_awaited_once_with(interaction, "prompt", n=2)